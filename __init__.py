@@ -150,19 +150,17 @@ class ImportWhm(bpy.types.Operator, ImportHelper):
     def execute(self, context):
         if self.new_project:
             bpy.ops.wm.read_homefile(app_template='')
-            for mesh in bpy.data.meshes:
-                bpy.data.meshes.remove(mesh)
             for material in bpy.data.materials:
                 material.user_clear()
-                bpy.data.materials.remove(material)
-            for cam in bpy.data.cameras:
-                bpy.data.cameras.remove(cam)
+            default_ids = [*bpy.data.meshes, *bpy.data.materials, *bpy.data.cameras]
+            if default_ids:
+                bpy.data.batch_remove(default_ids)
         addon_prefs = get_preferences(context)
         save_args(addon_prefs, self, 'import_whm',
                   'filepath', 'new_project', 'load_wtp', 'strict_mode')
         if not context.scene.dow_export_filename:
             context.scene.dow_export_filename = pathlib.Path(self.filepath).stem
-        with open(self.filepath, 'rb') as f:
+        with importer.open_model_file(self.filepath) as f:
             reader = importer.ChunkReader(f)
             loader = importer.WhmLoader(
                 pathlib.Path(addon_prefs.mod_folder),
@@ -171,7 +169,7 @@ class ImportWhm(bpy.types.Operator, ImportHelper):
                 context=context,
             )
             window = context.window_manager.windows[0]
-            with context.temp_override(window=window):
+            with context.temp_override(window=window), operators.rename_listener_suspended():
                 try:
                     loader.load(reader)
                     if self.load_wtp:
@@ -1,10 +1,14 @@
 import contextlib
 import dataclasses
+import functools
 import io
 import os
 import struct
 import typing
 
+import numpy as np
+import numpy.typing as npt
+
 
 @dataclasses.dataclass
 class ChunkHeader:  # -- Structure Holding Chunk Header Data
@@ -19,6 +23,9 @@ class ChunkHeader:  # -- Structure Holding Chunk Header Data
         return str(self.name_bytes.rstrip(b'\0'), 'utf8', errors='ignore')
 
 
+get_struct = functools.cache(struct.Struct)
+
+
 class ChunkReader:
     def __init__(self, stream):
         self.stream = stream
@@ -35,11 +42,13 @@ class ChunkReader:
         return ChunkHeader(typeid, version, size, name_length, name)
 
     def read_struct(self, fmt: str) -> tuple | None:
-        size = struct.calcsize(fmt)
-        buf = self.stream.read(size)
-        if len(buf) < size:
+        return self.unpack(get_struct(fmt))
+
+    def unpack(self, parser: struct.Struct) -> tuple | None:
+        buf = self.stream.read(parser.size)
+        if len(buf) < parser.size:
             return None
-        return struct.unpack(fmt, buf)
+        return parser.unpack(buf)
     
     def read_one(self, fmt: str) -> typing.Any:
         fields = self.read_struct(fmt)
@@ -48,6 +57,10 @@ class ChunkReader:
         assert len(fields) == 1, 'Need to parse exactly 1 value'
         return fields[0]
     
+    def read_array(self, dtype: npt.DTypeLike, count: int) -> np.ndarray:
+        dtype = np.dtype(dtype)
+        return np.frombuffer(self.stream.read(dtype.itemsize * count), dtype=dtype, count=count)
+
     def read_str(self, encoding='utf8', errors: str = 'ignore'):
         str_len = self.read_one('<l')
         if str_len == 0:
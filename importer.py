@@ -1,39 +1,226 @@
+import contextlib
 import dataclasses
 import io
 import pathlib
 import math
-import tempfile
+import mmap
+import os
+import struct
+import typing
 
 import bpy
 import mathutils
+import numpy as np
 
-from . import textures, utils, props
-from .chunky import ChunkReader
+from . import operators, textures, utils, props
+from .chunky import ChunkHeader, ChunkReader
 from .dow_layout import DowLayout, LayoutPath, DirectoryPath
 from .utils import print
 
 
-def open_reader(path: LayoutPath) -> ChunkReader:
-    return ChunkReader(io.BytesIO(path.read_bytes()))
+DEBUG = bool(os.environ.get('WHM_IMPORT_DEBUG'))  # -- print a separator between import_whm runs
+PRELOAD_SIZE_LIMIT = 64 * 1024 * 1024  # -- model files up to this size are read into memory at once
+UV_OFFSET_NODE_NAME = 'Mapping'  # -- referenced by the uv_offset and uv_tiling drivers
+SPEC_NODE_NAME = 'Apply spec'
+STRUCT_2F = struct.Struct('<2f')
+STRUCT_3F = struct.Struct('<3f')
+STRUCT_4F = struct.Struct('<4f')
+STRUCT_2I = struct.Struct('<2l')
+STRUCT_4I = struct.Struct('<4l')
+STRUCT_2U = struct.Struct('<2L')
+STRUCT_4U = struct.Struct('<4L')
+STRUCT_MARKER = struct.Struct('<9f 3f')
+STRUCT_FACE_RANGE = struct.Struct('<2Hl')
+MATERIAL_CHANNELS = (  # -- indexed by channel id: ((node, input) pairs to link, texture label)
+    ((('spec', 'A'), ('final', 'Emission Color')), 'diffuse'),
+    ((('spec', 'Factor'), ('final', 'Specular IOR Level')), 'specularity'),
+    ((('spec', 'B'),), 'reflection'),
+    ((('final', 'Emission Strength'),), 'self_illumination'),
+    ((('final', 'Alpha'),), 'opacity'),
+)
+TGA_IMAGE_FORMATS = frozenset({0, 2})  # -- everything else is DXT compressed
+WTP_LAYER_NAMES = ('primary', 'secondary', 'trim', 'weapons', 'eyes', 'dirt', 'default')  # -- indexed by layer id, -1 is the default layer
+BONE_DTYPE = np.dtype([('parent_idx', '<i4'), ('pos', '<f4', 3), ('rot', '<f4', 4)])
+VEC2_DTYPE = np.dtype(('<f4', 2))
+VEC3_DTYPE = np.dtype(('<f4', 3))
+FACE_DTYPE = np.dtype(('<u2', 3))
+SKIN_VERTEX_DTYPE = np.dtype([('weights', '<f4', 3), ('bones', 'u1', 4)])
+SHADOW_FACE_DTYPE = np.dtype([('normal', '<f4', 3), ('verts', '<u4', 3)])
+SHADOW_EDGE_DTYPE = np.dtype([('verts', '<u4', 2), ('faces', '<u4', 2), ('pos', '<f4', (2, 3))])
+COORD_FLIP = np.array([-1, -1, 1], dtype=np.float32)  # -- (x, z, y) in the file -> (-x, -y, z)
+POS_KEY_DTYPE = np.dtype([('frame', '<f4'), ('pos', '<f4', 3)])
+ROT_KEY_DTYPE = np.dtype([('frame', '<f4'), ('rot', '<f4', 4)])
+SCALAR_KEY_DTYPE = np.dtype([('frame', '<f4'), ('value', '<f4')])
+
+# -- Coordinate system conversions. Frozen so the shared instances cannot be modified in place
+ROOT_TRANSFORM = mathutils.Matrix.Rotation(math.radians(90.0), 4, 'X').freeze()
+BONE_AXIS_FIX = mathutils.Matrix.Rotation(math.radians(-90.0), 4, 'Z').freeze()
+BONE_AXIS_FIX_INV = BONE_AXIS_FIX.inverted().freeze()
+BONE_AXIS_FIX_ROT = BONE_AXIS_FIX.to_quaternion().freeze()
+BONE_AXIS_FIX_ROT_INV = BONE_AXIS_FIX_ROT.inverted().freeze()
+MARKER_COORD_TRANSFORM = mathutils.Matrix([[-1, 0, 0], [0, 1, 0], [0, 0, 1]]).to_4x4().freeze()
+MARKER_COORD_TRANSFORM_INV = MARKER_COORD_TRANSFORM.inverted().freeze()
+CAMERA_COORD_TRANSFORM = mathutils.Matrix([[-1, 0, 0], [0, 0, 1], [0, -1, 0]]).to_4x4().freeze()
+CAMERA_COORD_TRANSFORM_INV = CAMERA_COORD_TRANSFORM.inverted().freeze()
+CAMERA_COORD_ROT = CAMERA_COORD_TRANSFORM.to_quaternion().freeze()
+CAMERA_COORD_ROT_INV = CAMERA_COORD_ROT.inverted().freeze()
+CAMERA_WORLD_ROT = (
+    mathutils.Matrix.Rotation(math.radians(180.0), 4, 'Y').to_quaternion()
+    @ mathutils.Matrix.Rotation(math.radians(90.0), 4, 'X').to_quaternion()
+).freeze()
+
+
+@contextlib.contextmanager
+def open_reader(path: LayoutPath) -> typing.Iterator[ChunkReader]:
+    if isinstance(path, DirectoryPath) and path.data_size > 0:  # -- empty files cannot be mapped
+        with path.full_path.open('rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield ChunkReader(data)
+        return
+    # BytesIO shares the buffer of an immutable bytes object until it is written to, so the file is not copied again
+    with io.BytesIO(path.read_bytes()) as data:
+        yield ChunkReader(data)
+
+
+def open_model_file(path: str | pathlib.Path) -> typing.BinaryIO:
+    path = pathlib.Path(path)
+    if path.stat().st_size <= PRELOAD_SIZE_LIMIT:
+        return io.BytesIO(path.read_bytes())
+    with path.open('rb') as f:  # -- the mapping keeps its own handle
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
 
 @dataclasses.dataclass
-class BoneData:  # -- Structure To Hold Bone Data (4, X, 4, 28)
-    name: str = None
-    parent_idx: int = None
-    pos: list[float] = dataclasses.field(default_factory=lambda: [0] * 3)
-    rot: list[float] = dataclasses.field(default_factory=lambda: [0] * 4)
-
-
-@dataclasses.dataclass
-class SkinVertice:
-    weights: list[float] = dataclasses.field(default_factory=lambda: [0] * 4)
-    bone: list[float] = dataclasses.field(default_factory=lambda: [0] * 4)
+class Skeleton:  # -- Structure To Hold Bone Data (4, X, 4, 28) as parallel arrays
+    names: list[str] = dataclasses.field(default_factory=list)
+    parent_idx: np.ndarray = dataclasses.field(default_factory=lambda: np.empty(0, dtype=np.int32))
+    pos: np.ndarray = dataclasses.field(default_factory=lambda: np.empty((0, 3), dtype=np.float32))
+    rot: np.ndarray = dataclasses.field(default_factory=lambda: np.empty((0, 4), dtype=np.float32))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def extend(self, names: list[str], parent_idx: np.ndarray, pos: np.ndarray, rot: np.ndarray):
+        self.names.extend(names)
+        self.parent_idx = np.concatenate([self.parent_idx, parent_idx])
+        self.pos = np.concatenate([self.pos, pos])
+        self.rot = np.concatenate([self.rot, rot])
+
+
+def group_skin_weights(bone_ids: np.ndarray, weights: np.ndarray) -> typing.Iterator[tuple[int, float, np.ndarray]]:
+    # Yields (bone_id, weight, vertex_indices) for every distinct weight of every bone.
+    # Slots with bone_id == -1 or zero weight are skipped.
+    # If a vertex references the same bone in multiple slots the last one wins
+    num_vertices, num_slots = bone_ids.shape
+    vert_indices = np.repeat(np.arange(num_vertices, dtype=np.int32), num_slots)
+    bone_ids, weights = bone_ids.ravel(), weights.ravel()
+    mask = (bone_ids != -1) & (weights != 0)
+    vert_indices, bone_ids, weights = vert_indices[mask], bone_ids[mask], weights[mask]
+    if len(bone_ids) == 0:
+        return
+    order = np.argsort(bone_ids, kind='stable')  # keeps vertex order within each bone
+    vert_indices, weights = vert_indices[order], weights[order]
+    bone_counts = np.bincount(bone_ids)
+    bone_ends = np.cumsum(bone_counts)
+    for bone_id in np.flatnonzero(bone_counts):
+        start, end = bone_ends[bone_id] - bone_counts[bone_id], bone_ends[bone_id]
+        bone_vert_indices, bone_weights = vert_indices[start:end], weights[start:end]
+        is_last = np.append(bone_vert_indices[1:] != bone_vert_indices[:-1], True)
+        bone_vert_indices, bone_weights = bone_vert_indices[is_last], bone_weights[is_last]
+        unique_weights, weight_idx = np.unique(bone_weights, return_inverse=True)
+        if len(unique_weights) == 1:
+            yield int(bone_id), float(unique_weights[0]), bone_vert_indices
+            continue
+        weight_order = np.argsort(weight_idx, kind='stable')
+        weight_splits = np.cumsum(np.bincount(weight_idx))[:-1]
+        for weight, weight_vert_indices in zip(unique_weights.tolist(), np.split(bone_vert_indices[weight_order], weight_splits)):
+            yield int(bone_id), weight, weight_vert_indices
+
+
+def loc_rot_matrices(locs: np.ndarray, rots: np.ndarray) -> np.ndarray:
+    # Same as mathutils.Matrix.LocRotScale(loc, Quaternion(rot), None) for every row. rots are (w, x, y, z)
+    w, x, y, z = rots.astype(np.float64).T
+    res = np.zeros((len(locs), 4, 4))
+    res[:, 0, 0] = 1 - 2 * (y * y + z * z)
+    res[:, 0, 1] = 2 * (x * y - w * z)
+    res[:, 0, 2] = 2 * (x * z + w * y)
+    res[:, 1, 0] = 2 * (x * y + w * z)
+    res[:, 1, 1] = 1 - 2 * (x * x + z * z)
+    res[:, 1, 2] = 2 * (y * z - w * x)
+    res[:, 2, 0] = 2 * (x * z - w * y)
+    res[:, 2, 1] = 2 * (y * z + w * x)
+    res[:, 2, 2] = 1 - 2 * (x * x + y * y)
+    res[:, :3, 3] = locs
+    res[:, 3, 3] = 1
+    return res
+
+
+def compose_bone_transforms(parent_idx: np.ndarray, local_transforms: np.ndarray, root_transform: np.ndarray) -> np.ndarray:
+    # Parents are stored before their children, so bones of the same depth are multiplied in one batch
+    depth = np.zeros(len(parent_idx), dtype=np.int32)
+    for bone_idx, bone_parent_idx in enumerate(parent_idx.tolist()):
+        if bone_parent_idx != -1:
+            depth[bone_idx] = depth[bone_parent_idx] + 1
+    res = np.empty_like(local_transforms)
+    for level in range(depth.max(initial=-1) + 1):
+        level_idx = np.flatnonzero(depth == level)
+        parent_transforms = root_transform if level == 0 else res[parent_idx[level_idx]]
+        res[level_idx] = parent_transforms @ local_transforms[level_idx]
+    return res
+
+
+def quaternion_multiply(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # Hamilton product of (..., 4) arrays in (w, x, y, z) order, same as mathutils.Quaternion @ Quaternion
+    aw, ax, ay, az = np.moveaxis(a, -1, 0)
+    bw, bx, by, bz = np.moveaxis(b, -1, 0)
+    return np.stack([
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+    ], axis=-1)
+
+
+def make_quaternions_compatible(quats: np.ndarray, prev: np.ndarray) -> np.ndarray:
+    # Same as calling Quaternion.make_compatible on each row with the previous (already fixed) row, starting with prev
+    if len(quats) == 0:
+        return quats
+    dots = np.einsum('ij,ij->i', quats, np.vstack([prev, quats[:-1]]))
+    signs = np.cumprod(np.where(dots < 0, -1., 1.))
+    for idx in np.flatnonzero(dots == 0):  # -- make_compatible keeps the sign of orthogonal quaternions
+        signs[idx:] *= signs[idx]
+    return quats * signs[:, None]
+
+
+def insert_keyframes(action, data_path: str, frames, values, group: str, index: int = 0):
+    # Bulk version of keyframe_insert. values are either (N,) or (N, array_size) starting at the array index.
+    # Same as keyframe_insert, a key replaces the existing key on the same frame
+    frames = np.asarray(frames, dtype=np.float32)
+    if len(frames) == 0:
+        return
+    values = np.asarray(values, dtype=np.float32).reshape(len(frames), -1)
+    for value_idx in range(values.shape[1]):
+        fcurve = action.fcurves.find(data_path, index=index + value_idx)
+        if fcurve is None:
+            fcurve = action.fcurves.new(data_path, index=index + value_idx, action_group=group)
+        keyframe_points = fcurve.keyframe_points
+        num_existing = len(keyframe_points)
+        co = np.empty((num_existing + len(frames), 2), dtype=np.float32)
+        if num_existing:
+            existing_co = np.empty(num_existing * 2, dtype=np.float32)
+            keyframe_points.foreach_get('co', existing_co)
+            co[:num_existing] = existing_co.reshape(-1, 2)
+        co[num_existing:, 0] = frames
+        co[num_existing:, 1] = values[:, value_idx]
+        co = co[np.argsort(co[:, 0], kind='stable')]
+        co = co[np.append(co[1:, 0] != co[:-1, 0], True)]  # -- the last key on a frame wins
+        keyframe_points.add(len(co) - num_existing)
+        keyframe_points.foreach_set('co', co.ravel())
+        fcurve.update()
 
 
 class WhmLoader:
-    TEAMCOLORABLE_LAYERS = {'primary', 'secondary', 'trim', 'weapons', 'eyes'}
-    TEAMCOLORABLE_IMAGES = {'badge', 'banner'}
+    TEAMCOLORABLE_LAYERS = frozenset({'primary', 'secondary', 'trim', 'weapons', 'eyes'})
+    TEAMCOLORABLE_IMAGES = frozenset({'badge', 'banner'})
 
     def __init__(self, root: pathlib.Path, load_wtp: bool = True, stric_mode: bool = True, context=None):
         self.root = root
@@ -46,19 +233,24 @@ class WhmLoader:
         self.messages = []
 
     def _reset(self):
+        self.layout_find_cache = {}
         self.texture_count = 0
         self.loaded_material_paths = set()
         self.loaded_resource_stats = {'attempted': 0, 'errors': 0}
-        self.bone_array = []
-        self.xref_bone_array = []
+        self.bone_array = Skeleton()
+        self.xref_bone_array = Skeleton()
         self.blender_mesh_root = None
         self.blender_shadow_mesh_root = None
         self.bone_orig_transform = {}
         self.bone_transform = {}
+        self.pixel_buffer = np.empty(0, dtype=np.float32)
         self.created_materials = {}
         self.created_meshes = {}
         self.created_cameras = {}
         self.animated_cameras = {}
+        self.visibility_props = set()
+        self.skinned_objects = []
+        self.mesh_objects = []
         self.model_root_collection = None
 
         self.armature = bpy.data.armatures.new('Armature')
@@ -69,33 +261,52 @@ class WhmLoader:
         self.default_image['PLACEHOLDER'] = True
         self.default_image.use_fake_user = True
 
-    def ensure(self, condition: bool, message: str, level: str = 'WARNING'):
+    def ensure(self, condition: bool, message: str, *args, level: str = 'WARNING'):
+        # -- message is %-formatted with args only when the condition fails
         if self.stric_mode:
-            assert condition, message
+            assert condition, message % args if args else message
             return
         if not condition:
+            if args:
+                message = message % args
             self.messages.append((level, f'Assestion violated: {message}'))
         return condition
 
+    def find_file(self, path: str | pathlib.PurePath) -> LayoutPath | None:  # -- Cached layout lookup, xrefs often repeat the same file
+        key = str(path)
+        if key not in self.layout_find_cache:
+            self.layout_find_cache[key] = self.layout.find(path)
+        return self.layout_find_cache[key]
+
+    def decode_tga_pixels(self, reader: ChunkReader, data_size: int, width: int, height: int, grayscale: bool = False) -> np.ndarray:
+        # The result is only valid until the next call, it is meant to be passed straight to pixels.foreach_set
+        num_values = width * height * 4
+        if self.pixel_buffer.size < num_values:
+            self.pixel_buffer = np.empty(num_values, dtype=np.float32)
+        return textures.decode_tga_pixels(
+            reader.stream, data_size, width, height, grayscale, out=self.pixel_buffer[:num_values])
+
     def CH_DATASSHR(self, reader: ChunkReader):  # CH_DATASSHR > - Chunk Handler - Material Data
         material_path = reader.read_str()  # -- Read Texture Path
         self.loaded_resource_stats['attempted'] += 1
 
         if material_path not in self.loaded_material_paths:
             full_material_path = f'{material_path}.rsh'
-            material_data = self.layout.find(full_material_path)
+            material_data = self.find_file(full_material_path)
             if not material_data:
                 self.messages.append(('WARNING', f'Cannot find material file "{full_material_path}"'))
                 self.loaded_resource_stats['errors'] += 1
                 return
-            material = self.load_rsh(open_reader(material_data), material_path)  # -- create new material
+            with open_reader(material_data) as material_reader:
+                material = self.load_rsh(material_reader, material_path)  # -- create new material
             if self.wtp_load_enabled:
                 teamcolor_path = f'{material_path}_default.wtp'
-                teamcolor_data = self.layout.find(teamcolor_path)
+                teamcolor_data = self.find_file(teamcolor_path)
                 if not teamcolor_data:
                     self.messages.append(('INFO', f'Cannot find {teamcolor_path}'))
                 else:
-                    self.load_wtp(open_reader(teamcolor_data), material_path, material)
+                    with open_reader(teamcolor_data) as teamcolor_reader:
+                        self.load_wtp(teamcolor_reader, material_path, material)
             self.loaded_material_paths.add(material_path)
 
     def load_rsh(self, reader: ChunkReader, material_path: str):
@@ -103,42 +314,51 @@ class WhmLoader:
         current_chunk = reader.read_header('FOLDSHRF')  # Skip 'Folder SHRF' Header
         loaded_textures = {}
         material = None
+
+        def load_texture(reader: ChunkReader, chunk: ChunkHeader):
+            loaded_textures[chunk.name.lower()] = self.CH_FOLDTXTR(reader, chunk.name)
+
+        def load_material(reader: ChunkReader, chunk: ChunkHeader):
+            nonlocal material
+            material = self.CH_FOLDSHDR(reader, material_path, loaded_textures)
+
+        chunk_handlers = {
+            'FOLDTXTR': load_texture,  # FOLDTXTR - Internal Texture
+            'FOLDSHDR': load_material,  # FOLDSHDR - Material
+        }
+
         for current_chunk in reader.iter_chunks():
-            match current_chunk.typeid:
-                case 'FOLDTXTR': loaded_textures[current_chunk.name.lower()] = self.CH_FOLDTXTR(reader, current_chunk.name)  # FOLDTXTR - Internal Texture
-                case 'FOLDSHDR': material = self.CH_FOLDSHDR(reader, material_path, loaded_textures)
-                case _: reader.skip(current_chunk.size)
+            handler = chunk_handlers.get(current_chunk.typeid)
+            if handler is None:
+                reader.skip(current_chunk.size)
+                continue
+            handler(reader, current_chunk)
         return material
 
     def CH_FOLDTXTR(self, reader: ChunkReader, texture_path: str):  # Chunk Handler - Internal Texture
         for current_chunk in reader.iter_chunks():
             match current_chunk.typeid:
                 case 'DATAHEAD':
-                    image_type, num_images = reader.read_struct('<2l')
+                    image_type, num_images = reader.unpack(STRUCT_2I)
                 case 'DATAINFO':
                     reader.skip(current_chunk.size)
                 case 'FOLDIMAG':
                     break
         current_chunk = reader.read_header('DATAATTR')
-        image_format, width, height, num_mips = reader.read_struct('<4l')
+        image_format, width, height, num_mips = reader.unpack(STRUCT_4I)
         current_chunk = reader.read_header('DATADATA')
 
         texture_name = pathlib.Path(texture_path).name
-        with tempfile.TemporaryDirectory() as tmpdir:
-            is_tga = image_format in (0, 2)
-            if is_tga:
-                with open(f'{tmpdir}/{texture_name}.tga', 'wb') as f:
-                    textures.write_tga(
-                        reader.stream, f, current_chunk.size, width, height)
-            else:
-                with open(f'{tmpdir}/{texture_name}.dds', 'wb') as f:
-                    textures.write_dds(
-                        reader.stream, f, current_chunk.size, width, height, num_mips, image_format)
-            image = bpy.data.images.load(f.name)
-            if is_tga:
-                image = utils.flip_image_y(image)
+        if image_format in TGA_IMAGE_FORMATS:
+            pixels = self.decode_tga_pixels(reader, current_chunk.size, width, height)
+            image = utils.create_image(f'{texture_name}.tga', width, height, pixels)
             image.pack()
-            image.use_fake_user = True
+        else:
+            dds_data = io.BytesIO()
+            textures.write_dds(
+                reader.stream, dds_data, current_chunk.size, width, height, num_mips, image_format)
+            image = utils.load_packed_image(f'{texture_name}.dds', dds_data.getvalue())
+        image.use_fake_user = True
         return image
 
     def CH_FOLDSHDR(self, reader: ChunkReader, material_path: str, loaded_textures: dict):  # Chunk Handler - Material
@@ -151,9 +371,7 @@ class WhmLoader:
             channel_idx, method, *colour_mask = reader.read_struct('<2l4B')
             channel_texture_name = reader.read_str()
             num_coords = reader.read_one('<4x l 4x')
-            for _ in range(4):  # always 4, not num_coords
-                for ref_idx in range(4):
-                    x, y = reader.read_struct('<2f')
+            reader.skip(4 * 4 * STRUCT_2F.size)  # -- UV coords: always 4x4, not num_coords. Unused
             channels.append({
                 'idx': channel_idx,
                 'texture_name': channel_texture_name,
@@ -167,50 +385,47 @@ class WhmLoader:
         mat.blend_method = 'CLIP'
         mat.show_transparent_back = False
         mat.use_nodes = True
-        links = mat.node_tree.links
+        links_new = mat.node_tree.links.new
+        nodes_new = mat.node_tree.nodes.new
         node_final = mat.node_tree.nodes[0]
 
-        node_uv = mat.node_tree.nodes.new('ShaderNodeTexCoord')
+        node_uv = nodes_new('ShaderNodeTexCoord')
         node_uv.location = -800, 200
-        node_uv_offset = mat.node_tree.nodes.new('ShaderNodeMapping')
+        node_uv_offset = nodes_new('ShaderNodeMapping')
+        node_uv_offset.name = UV_OFFSET_NODE_NAME
         node_uv_offset.label = 'UV offset'
         node_uv_offset.location = -600, 200
-        links.new(node_uv.outputs[2], node_uv_offset.inputs['Vector'])
+        links_new(node_uv.outputs[2], node_uv_offset.inputs['Vector'])
 
-        node_object_info = mat.node_tree.nodes.new('ShaderNodeObjectInfo')
+        node_object_info = nodes_new('ShaderNodeObjectInfo')
         node_object_info.location = -600, 400
 
-        node_calc_spec = mat.node_tree.nodes.new('ShaderNodeMix')
+        node_calc_spec = nodes_new('ShaderNodeMix')
         node_calc_spec.data_type = 'RGBA'
         node_calc_spec.clamp_result = True
         node_calc_spec.inputs[0].default_value = 0
-        node_calc_spec.label = 'Apply spec'
+        node_calc_spec.name = node_calc_spec.label = SPEC_NODE_NAME
         node_calc_spec.location = -150, 400
-        links.new(node_calc_spec.outputs['Result'], node_final.inputs['Base Color'])
+        links_new(node_calc_spec.outputs['Result'], node_final.inputs['Base Color'])
 
-        node_calc_alpha = mat.node_tree.nodes.new('ShaderNodeMath')
+        node_calc_alpha = nodes_new('ShaderNodeMath')
         node_calc_alpha.operation = 'MULTIPLY'
         node_calc_alpha.use_clamp = True
         node_calc_alpha.inputs[1].default_value = 1
         node_calc_alpha.location = -150, 150
-        links.new(node_object_info.outputs['Alpha'], node_calc_alpha.inputs[0])
-        links.new(node_calc_alpha.outputs[0], node_final.inputs['Alpha'])
+        links_new(node_object_info.outputs['Alpha'], node_calc_alpha.inputs[0])
+        links_new(node_calc_alpha.outputs[0], node_final.inputs['Alpha'])
 
+        channel_nodes = {'spec': node_calc_spec, 'final': node_final}
         created_tex_nodes = {}
         for channel in channels:
             if (texture_name := channel['texture_name'].lower()) == '':
                 continue
             channel_idx = channel['idx']
-            inputs, node_label = {
-                0: ([node_calc_spec.inputs['A'], node_final.inputs['Emission Color']], 'diffuse'),
-                1: ([node_calc_spec.inputs['Factor'], node_final.inputs['Specular IOR Level']], 'specularity'),
-                2: ([node_calc_spec.inputs['B']], 'reflection'),
-                3: ([node_final.inputs['Emission Strength']], 'self_illumination'),
-                4: ([node_final.inputs['Alpha']], 'opacity'),
-            }[channel_idx]
+            inputs, node_label = MATERIAL_CHANNELS[channel_idx]
             node_tex = created_tex_nodes.get(texture_name)
             if not node_tex:
-                node_tex = mat.node_tree.nodes.new('ShaderNodeTexImage')
+                node_tex = nodes_new('ShaderNodeTexImage')
                 node_image = loaded_textures.get(texture_name)
                 if node_image is None:
                     self.messages.append(('WARNING', f'Material "{material_name}": cannot find {node_label} texture ("{texture_name}")'))
@@ -220,24 +435,24 @@ class WhmLoader:
                 node_tex.label = node_label
                 created_tex_nodes[texture_name] = node_tex
             if channel_idx == 2:
-                node_global_to_camera = mat.node_tree.nodes.new('ShaderNodeVectorTransform')
+                node_global_to_camera = nodes_new('ShaderNodeVectorTransform')
                 node_global_to_camera.convert_to = 'CAMERA'
                 node_global_to_camera.location = -600, -200
-                links.new(node_uv.outputs[6], node_global_to_camera.inputs['Vector'])
-                node_fix_reflect = mat.node_tree.nodes.new('ShaderNodeMapping')
+                links_new(node_uv.outputs[6], node_global_to_camera.inputs['Vector'])
+                node_fix_reflect = nodes_new('ShaderNodeMapping')
                 node_fix_reflect.label = 'Rotate reflection vector'
                 node_fix_reflect.vector_type = 'VECTOR'
                 node_fix_reflect.inputs['Rotation'].default_value = math.pi, 0, 0
                 node_fix_reflect.location = -600, -400
-                links.new(node_global_to_camera.outputs[0], node_fix_reflect.inputs['Vector'])
-                links.new(node_fix_reflect.outputs[0], node_tex.inputs['Vector'])
+                links_new(node_global_to_camera.outputs[0], node_fix_reflect.inputs['Vector'])
+                links_new(node_fix_reflect.outputs[0], node_tex.inputs['Vector'])
             else:
-                links.new(node_uv_offset.outputs[0], node_tex.inputs['Vector'])
+                links_new(node_uv_offset.outputs[0], node_tex.inputs['Vector'])
             if channel_idx in (0, 4):
-                links.new(node_tex.outputs['Alpha'], node_calc_alpha.inputs[1])
+                links_new(node_tex.outputs['Alpha'], node_calc_alpha.inputs[1])
             if channel_idx != 4:
-                for i in inputs:
-                    links.new(node_tex.outputs[0], i)
+                for node_key, input_name in inputs:
+                    links_new(node_tex.outputs[0], channel_nodes[node_key].inputs[input_name])
 
         props.setup_drivers(mat, self.armature_obj, props.create_prop_name('uv_offset', material_name))
         props.setup_drivers(mat, self.armature_obj, props.create_prop_name('uv_tiling', material_name))
@@ -249,66 +464,63 @@ class WhmLoader:
         current_chunk = reader.read_header('FOLDTPAT')
         loaded_textures = {}
         current_chunk = reader.read_header('DATAINFO')
-        width, height = reader.read_struct('<2L')
-        layer_names = {
-            0: 'primary',
-            1: 'secondary',
-            2: 'trim',
-            3: 'weapons',
-            4: 'eyes',
-            5: 'dirt',
-            -1: 'default',
-        }
+        width, height = reader.unpack(STRUCT_2U)
         material_name = pathlib.Path(material_path).name
         default_image_size = width, height
         badge_data = None
         banner_data = None
+
+        def load_layer(reader: ChunkReader, chunk: ChunkHeader):
+            layer_in, data_size = reader.unpack(STRUCT_2U)
+            pixels = self.decode_tga_pixels(reader, data_size, width, height, grayscale=True)
+            image = utils.create_image(f'{material_name}_{WTP_LAYER_NAMES[layer_in]}.tga', width, height, pixels, alpha=False)
+            image.pack()
+            image.use_fake_user = True
+            loaded_textures[WTP_LAYER_NAMES[layer_in]] = image
+
+        def load_default_image(reader: ChunkReader, chunk: ChunkHeader):
+            nonlocal width, height
+            current_chunk = reader.read_header('DATAATTR')
+            image_format, width, height, num_mips = reader.unpack(STRUCT_4U)
+            current_chunk = reader.read_header('DATADATA')
+            layer_in = -1
+            pixels = self.decode_tga_pixels(reader, current_chunk.size, width, height)
+            image = utils.create_image(f'{material_name}_{WTP_LAYER_NAMES[layer_in]}.tga', width, height, pixels)
+            image.pack()
+            image.use_fake_user = True
+            loaded_textures[WTP_LAYER_NAMES[layer_in]] = image
+
+        def load_badge(reader: ChunkReader, chunk: ChunkHeader):
+            nonlocal badge_data
+            badge_data = reader.unpack(STRUCT_4F)
+
+        def load_banner(reader: ChunkReader, chunk: ChunkHeader):
+            nonlocal banner_data
+            banner_data = reader.unpack(STRUCT_4F)
+
+        chunk_handlers = {
+            'DATAPTLD': load_layer,
+            'FOLDIMAG': load_default_image,
+            'DATAPTBD': load_badge,  # badge - 64 by 64
+            'DATAPTBN': load_banner,  # banner - 96 by 64
+        }
+
         for current_chunk in reader.iter_chunks():
-            match current_chunk.typeid:
-                case 'DATAPTLD':
-                    layer_in, data_size = reader.read_struct('<2L')
-                    with tempfile.TemporaryDirectory() as tmpdir:
-                        with open(f'{tmpdir}/{material_name}_{layer_names[layer_in]}.tga', 'wb') as f:
-                            textures.write_tga(
-                                reader.stream, f, data_size, width, height, grayscale=True)
-                        image = bpy.data.images.load(f.name)
-                        image = utils.flip_image_y(image)
-                        image.pack()
-                        image.use_fake_user = True
-                        loaded_textures[layer_names[layer_in]] = image
-                case 'FOLDIMAG':
-                    current_chunk = reader.read_header('DATAATTR')
-                    image_format, width, height, num_mips = reader.read_struct('<4L')
-                    current_chunk = reader.read_header('DATADATA')
-                    layer_in = -1
-                    with tempfile.TemporaryDirectory() as tmpdir:
-                        with open(f'{tmpdir}/{material_name}_{layer_names[layer_in]}.tga', 'wb') as f:
-                            textures.write_tga(
-                                reader.stream, f, current_chunk.size, width, height, grayscale=False)
-                        image = bpy.data.images.load(f.name)
-                        image = utils.flip_image_y(image)
-                        image.pack()
-                        image.use_fake_user = True
-                        loaded_textures[layer_names[layer_in]] = image
-                case 'DATAPTBD':  # badge - 64 by 64
-                    badge_data = reader.read_struct('<4f')
-                case 'DATAPTBN':  # banner - 96 by 64
-                    banner_data = reader.read_struct('<4f')
-                case _:
-                    self.messages.append(('INFO', f'Unknown .wtp chunk {current_chunk.typeid} ({material_path})'))
-                    reader.skip(current_chunk.size)
+            handler = chunk_handlers.get(current_chunk.typeid)
+            if handler is None:
+                self.messages.append(('INFO', f'Unknown .wtp chunk {current_chunk.typeid} ({material_path})'))
+                reader.skip(current_chunk.size)
+                continue
+            handler(reader, current_chunk)
 
-        links = material.node_tree.links
+        links_new = material.node_tree.links.new
+        nodes_new = material.node_tree.nodes.new
         common_node_pos_x, common_node_pos_y = -600, 3100
-        uf_offset_node = [
-            node for node in material.node_tree.nodes
-            if node.bl_idname == 'ShaderNodeMapping'
-            and node.label == 'UV offset'
-        ][0]
+        uf_offset_node = material.node_tree.nodes[UV_OFFSET_NODE_NAME]
         created_tex_nodes = {}
         prev_color_output = None
-        for layer_name in layer_names.values():
-            node_tex = material.node_tree.nodes.new('ShaderNodeTexImage')
+        for layer_name in WTP_LAYER_NAMES:
+            node_tex = nodes_new('ShaderNodeTexImage')
             node_pos_x, node_pos_y = common_node_pos_x, common_node_pos_y - 290 * len(created_tex_nodes)
             created_tex_nodes[layer_name] = node_tex
             if layer_name in loaded_textures:
@@ -318,37 +530,37 @@ class WhmLoader:
                 node_tex.image = self.default_image
             node_tex.location = node_pos_x + 200, node_pos_y
             node_tex.label = f'color_layer_{layer_name}'
-            links.new(uf_offset_node.outputs[0], node_tex.inputs['Vector'])
+            links_new(uf_offset_node.outputs[0], node_tex.inputs['Vector'])
 
             if layer_name in self.TEAMCOLORABLE_LAYERS:
-                node_color = material.node_tree.nodes.new('ShaderNodeValToRGB')
+                node_color = nodes_new('ShaderNodeValToRGB')
                 node_color.label = f'color_{layer_name}'
                 node_color.location = node_pos_x + 480, node_pos_y
                 node_color.width = 100
-                links.new(node_tex.outputs[0], node_color.inputs['Fac'])
+                links_new(node_tex.outputs[0], node_color.inputs['Fac'])
                 if prev_color_output is None:
                     prev_color_output = node_color.outputs[0]
                 else:
-                    node_mix = material.node_tree.nodes.new('ShaderNodeMixRGB')
+                    node_mix = nodes_new('ShaderNodeMixRGB')
                     node_mix.blend_type = 'ADD'
                     node_mix.inputs['Fac'].default_value = 1
                     node_mix.location = node_pos_x + 650, node_pos_y
-                    links.new(prev_color_output, node_mix.inputs['Color1'])
-                    links.new(node_color.outputs['Color'], node_mix.inputs['Color2'])
+                    links_new(prev_color_output, node_mix.inputs['Color1'])
+                    links_new(node_color.outputs['Color'], node_mix.inputs['Color2'])
                     prev_color_output = node_mix.outputs[0]
 
-        img_size_node = material.node_tree.nodes.new('ShaderNodeCombineXYZ')
+        img_size_node = nodes_new('ShaderNodeCombineXYZ')
         img_size_node.inputs['X'].default_value = default_image_size[0]
         img_size_node.inputs['Y'].default_value = default_image_size[1]
         img_size_node.label = 'color_layer_size'
         img_size_node.location = common_node_pos_x - 300, common_node_pos_y - 290 * len(created_tex_nodes) + 200
 
-        flip_texture_node = material.node_tree.nodes.new('ShaderNodeMapping')
+        flip_texture_node = nodes_new('ShaderNodeMapping')
         flip_texture_node.label = 'Flip'
         flip_texture_node.location = common_node_pos_x - 450, common_node_pos_y - 290 * len(created_tex_nodes) + 200
         flip_texture_node.inputs['Location'].default_value = (0, 1, 0)
         flip_texture_node.inputs['Scale'].default_value = (1, -1, 1)
-        links.new(uf_offset_node.outputs[0], flip_texture_node.inputs['Vector'])
+        links_new(uf_offset_node.outputs[0], flip_texture_node.inputs['Vector'])
 
         for layer_name, layer_data in [
             ('badge', badge_data),
@@ -362,38 +574,38 @@ class WhmLoader:
                 node_name = layer_name
                 default_image = None
             node_pos_x, node_pos_y = common_node_pos_x, common_node_pos_y - 290 * len(created_tex_nodes)
-            data_pos_node = material.node_tree.nodes.new('ShaderNodeCombineXYZ')
+            data_pos_node = nodes_new('ShaderNodeCombineXYZ')
             data_pos_node.inputs['X'].default_value = layer_data[0]
             data_pos_node.inputs['Y'].default_value = layer_data[1]
             data_pos_node.location = node_pos_x - 300, node_pos_y
             data_pos_node.label = f'{layer_name}_position'
 
-            data_size_node = material.node_tree.nodes.new('ShaderNodeCombineXYZ')
+            data_size_node = nodes_new('ShaderNodeCombineXYZ')
             data_size_node.inputs['X'].default_value = layer_data[2]
             data_size_node.inputs['Y'].default_value = layer_data[3]
             data_size_node.location = node_pos_x - 300, node_pos_y - 150
             data_size_node.label = f'{layer_name}_display_size'
 
-            calc_pos_node = material.node_tree.nodes.new('ShaderNodeVectorMath')
+            calc_pos_node = nodes_new('ShaderNodeVectorMath')
             calc_pos_node.operation = 'DIVIDE'
             calc_pos_node.location = node_pos_x - 150, node_pos_y
-            links.new(data_pos_node.outputs[0], calc_pos_node.inputs[0])
-            links.new(img_size_node.outputs[0], calc_pos_node.inputs[1])
+            links_new(data_pos_node.outputs[0], calc_pos_node.inputs[0])
+            links_new(img_size_node.outputs[0], calc_pos_node.inputs[1])
 
-            calc_scale_node = material.node_tree.nodes.new('ShaderNodeVectorMath')
+            calc_scale_node = nodes_new('ShaderNodeVectorMath')
             calc_scale_node.operation = 'DIVIDE'
             calc_scale_node.location = node_pos_x - 150, node_pos_y - 150
-            links.new(data_size_node.outputs[0], calc_scale_node.inputs[0])
-            links.new(img_size_node.outputs[0], calc_scale_node.inputs[1])
+            links_new(data_size_node.outputs[0], calc_scale_node.inputs[0])
+            links_new(img_size_node.outputs[0], calc_scale_node.inputs[1])
 
-            scale_node = material.node_tree.nodes.new('ShaderNodeMapping')
+            scale_node = nodes_new('ShaderNodeMapping')
             scale_node.vector_type = 'TEXTURE'
             scale_node.location = node_pos_x, node_pos_y
-            links.new(flip_texture_node.outputs[0], scale_node.inputs['Vector'])
-            links.new(calc_pos_node.outputs[0], scale_node.inputs['Location'])
-            links.new(calc_scale_node.outputs[0], scale_node.inputs['Scale'])
+            links_new(flip_texture_node.outputs[0], scale_node.inputs['Vector'])
+            links_new(calc_pos_node.outputs[0], scale_node.inputs['Location'])
+            links_new(calc_scale_node.outputs[0], scale_node.inputs['Scale'])
 
-            node_tex = material.node_tree.nodes.new('ShaderNodeTexImage')
+            node_tex = nodes_new('ShaderNodeTexImage')
             created_tex_nodes[layer_name] = node_tex
             # node_tex.hide = True
             node_tex.extension = 'CLIP'
@@ -402,28 +614,26 @@ class WhmLoader:
             if default_image is not None:
                 node_tex.image = default_image
                 node_tex.hide = True
-            links.new(scale_node.outputs[0], node_tex.inputs['Vector'])
+            links_new(scale_node.outputs[0], node_tex.inputs['Vector'])
 
-            node_mix = material.node_tree.nodes.new('ShaderNodeMixRGB')
+            node_mix = nodes_new('ShaderNodeMixRGB')
             node_mix.blend_type = 'MIX'
             node_mix.location = node_pos_x + 480, node_pos_y
-            links.new(node_tex.outputs['Alpha'], node_mix.inputs['Fac'])
-            links.new(prev_color_output, node_mix.inputs['Color1'])
-            links.new(node_tex.outputs['Color'], node_mix.inputs['Color2'])
+            links_new(node_tex.outputs['Alpha'], node_mix.inputs['Fac'])
+            links_new(prev_color_output, node_mix.inputs['Color1'])
+            links_new(node_tex.outputs['Color'], node_mix.inputs['Color2'])
             prev_color_output = node_mix.outputs[0]
 
-        node_mix_dirt = material.node_tree.nodes.new('ShaderNodeMixRGB')
+        node_mix_dirt = nodes_new('ShaderNodeMixRGB')
         node_mix_dirt.blend_type = 'ADD'
         node_mix_dirt.location = common_node_pos_x + 650, common_node_pos_y - 290 * (len(created_tex_nodes) - 1)
-        links.new(created_tex_nodes['dirt'].outputs['Color'], node_mix_dirt.inputs['Fac'])
-        links.new(prev_color_output, node_mix_dirt.inputs['Color1'])
-        links.new(created_tex_nodes['default'].outputs['Color'], node_mix_dirt.inputs['Color2'])
+        links_new(created_tex_nodes['dirt'].outputs['Color'], node_mix_dirt.inputs['Fac'])
+        links_new(prev_color_output, node_mix_dirt.inputs['Color1'])
+        links_new(created_tex_nodes['default'].outputs['Color'], node_mix_dirt.inputs['Color2'])
 
         if 'default' in loaded_textures:
-            for node in material.node_tree.nodes:
-                if node.label == 'Apply spec':
-                    links.new(node_mix_dirt.outputs[0], node.inputs['A'])
-            links.new(node_mix_dirt.outputs[0], material.node_tree.nodes[0].inputs['Emission Color'])
+            links_new(node_mix_dirt.outputs[0], material.node_tree.nodes[SPEC_NODE_NAME].inputs['A'])
+            links_new(node_mix_dirt.outputs[0], material.node_tree.nodes[0].inputs['Emission Color'])
         else:
             self.messages.append(('WARNING', f'Material {material_path} is missing the default layer'))
 
@@ -432,13 +642,13 @@ class WhmLoader:
 
         num_bones = reader.read_one('<l') # -- Read Number Of Bones
         bone_array = self.xref_bone_array if xref else self.bone_array
+        bone_names = []
+        bone_records = bytearray()
         for _ in range(num_bones):  # -- Read Each Bone Data
-            bone = BoneData()  # -- Reset Bonedata Structure
-            bone.name = reader.read_str()  # -- Read Bone Name
-            bone.parent_idx = reader.read_one('<l')  # -- Read Bone Hierarchy Level
-            bone.pos = reader.read_struct('<3f')  # -- Read Bone X, Y and Z Positions
-            bone.rot = reader.read_struct('<4f')  # -- Read Bone X, Y, Z and W Rotation
-            bone_array.append(bone)  #-- Add Bone To Bone Array
+            bone_names.append(reader.read_str())  # -- Read Bone Name
+            bone_records += reader.stream.read(BONE_DTYPE.itemsize)  # -- Read Bone Hierarchy Level, X, Y, Z Positions and X, Y, Z, W Rotation
+        bone_records = np.frombuffer(bone_records, dtype=BONE_DTYPE)
+        bone_array.extend(bone_names, bone_records['parent_idx'], bone_records['pos'], bone_records['rot'])  #-- Add Bones To Bone Array
 
         if xref:
             return
@@ -447,41 +657,43 @@ class WhmLoader:
         self.bpy_context.view_layer.objects.active = self.armature_obj
         bpy.ops.object.mode_set(mode='EDIT', toggle=True)
         bone_collection = self.armature.collections.new('Skeleton')
-        bone_transforms = []
         created_bones_array = []
 
-        for bone_idx, bone in enumerate(bone_array):  # -- read each bone data
+        # ---< POSITION & ROTATION >---
+
+        # Mirror along the X-axis. See https://stackoverflow.com/a/33999726
+        orig_transforms = loc_rot_matrices(
+            bone_array.pos * np.array([-1, 1, 1], dtype=np.float32),
+            bone_array.rot[:, [3, 0, 1, 2]] * np.array([1, 1, -1, -1], dtype=np.float32),
+        )
+        bone_transforms = compose_bone_transforms(bone_array.parent_idx, orig_transforms, np.array(ROOT_TRANSFORM))
+        bone_matrices = bone_transforms @ np.array(BONE_AXIS_FIX)
+
+        for bone_name, parent_idx, orig_transform, bone_transform, bone_matrix in zip(
+            bone_array.names,
+            bone_array.parent_idx.tolist(),
+            orig_transforms.tolist(),
+            bone_transforms.tolist(),
+            bone_matrices.tolist(),
+        ):  # -- read each bone data
             # ---< CREATE BONE >---
 
-            new_bone = self.armature.edit_bones.new(bone.name)  # -- Create Bone and Set Name
+            new_bone = self.armature.edit_bones.new(bone_name)  # -- Create Bone and Set Name
             new_bone.head = (0, 0, 0)
             new_bone.tail = (0.5, 0, 0)
             new_bone.inherit_scale = 'NONE'  # -- Stretch Off
             bone_collection.assign(new_bone)
-            orig_transform = mathutils.Matrix.LocRotScale(
-                mathutils.Vector([-bone.pos[0], bone.pos[1], bone.pos[2]]),
-                mathutils.Quaternion([bone.rot[3], bone.rot[0], -bone.rot[1], -bone.rot[2]]),  # Mirror along the X-axis. See https://stackoverflow.com/a/33999726
-                None,
-            )
 
             # ---< LINK BONE >---
 
-            if bone.parent_idx != -1:
-                new_bone.parent = created_bones_array[bone.parent_idx]
+            if parent_idx != -1:
+                new_bone.parent = created_bones_array[parent_idx]
             
             created_bones_array.append(new_bone)  # -- Add New Bone To Created Bones Array
 
-            # ---< POSITION & ROTATION >---
-
-            if bone.parent_idx != -1:
-                parent_mat = bone_transforms[bone.parent_idx]
-            else:
-                parent_mat = mathutils.Matrix.Rotation(math.radians(90.0), 4, 'X')
-            bone_transform = parent_mat @ orig_transform
-            new_bone.matrix = bone_transform @ mathutils.Matrix.Rotation(math.radians(-90.0), 4, 'Z')
-            self.bone_orig_transform[bone.name] = orig_transform
-            self.bone_transform[bone.name] = bone_transform
-            bone_transforms.append(bone_transform)
+            new_bone.matrix = mathutils.Matrix(bone_matrix)
+            self.bone_orig_transform[bone_name] = mathutils.Matrix(orig_transform)
+            self.bone_transform[bone_name] = mathutils.Matrix(bone_transform)
 
         for bone in created_bones_array:
             if len(bone.children) == 1:
@@ -494,10 +706,10 @@ class WhmLoader:
         for current_chunk in reader.iter_chunks():                                # Read FOLDMSLC Chunks
             match current_chunk.typeid:
                 case "FOLDMSLC": self.CH_FOLDMSLC(reader, current_chunk.name, False)  # 	 - Mesh Data
-                case "DATADATA": self.CH_DATADATA(reader)                             # -- DATADATA - Mesh List
+                case "DATADATA": self.CH_DATADATA(reader.read_folder(current_chunk))  # -- DATADATA - Mesh List
                 case "DATABVOL":                                                      # -- DATABVOL - Unknown
                     bbox_flag, *bbox_center = reader.read_struct('<b3f')
-                    bbox_size = reader.read_struct('<3f')
+                    bbox_size = reader.unpack(STRUCT_3F)
                     bbox_rot_mat = reader.read_struct('<9f')
                     return True
 
@@ -506,23 +718,18 @@ class WhmLoader:
         bpy.ops.object.mode_set(mode='EDIT', toggle=True)
         bone_collection = self.armature.collections.new('Markers')
 
-        coord_transform = mathutils.Matrix([[-1, 0, 0], [0, 1, 0], [0, 0, 1]]).to_4x4()
-        coord_transform_inv = coord_transform.inverted()
-
         num_markers = reader.read_one('<l')  # -- Read Number Of Markers
         for i in range(num_markers):  # -- Read All Markers
             marker_name = reader.read_str()  # -- Read Marker Name
             parent_name = reader.read_str()  # -- Read Parent Name
-            rot = mathutils.Matrix().to_3x3()
-            for row_idx in range(3):  # -- Read Matrix
-                rot[row_idx][:3] = reader.read_struct('<3f')
-            pos = reader.read_struct('<3f')
+            marker_data = reader.unpack(STRUCT_MARKER)  # -- Read Matrix Rows And Position
+            rot = mathutils.Matrix((marker_data[0:9:3], marker_data[1:9:3], marker_data[2:9:3]))  # -- Transposed
 
-            transform = coord_transform_inv @ mathutils.Matrix.LocRotScale(
-                mathutils.Vector(pos),
-                rot.transposed(),
+            transform = MARKER_COORD_TRANSFORM_INV @ mathutils.Matrix.LocRotScale(
+                mathutils.Vector(marker_data[9:]),
+                rot,
                 None,
-            ) @ coord_transform
+            ) @ MARKER_COORD_TRANSFORM
 
             marker = self.armature.edit_bones.new(marker_name)  # -- Create Bone and Set Name
             marker.head = (0, 0, 0)
@@ -540,7 +747,7 @@ class WhmLoader:
             if parent is None:
                 if parent_name.strip():
                     self.messages.append(('WARNING', f'Marker "{marker_name}" is attached to non-existent bone "{parent_name}"'))
-                parent_mat = mathutils.Matrix.Rotation(math.radians(90.0), 4, 'X')
+                parent_mat = ROOT_TRANSFORM
             else:
                 marker.parent = parent  # -- Set Parent Of New Marker
                 parent_mat = self.bone_transform[parent_name]
@@ -560,26 +767,19 @@ class WhmLoader:
         cameras_collection = bpy.data.collections.new('Cameras')
         self.model_root_collection.children.link(cameras_collection)
 
-        coord_transform = mathutils.Matrix([[-1, 0, 0], [0, 0, 1], [0, -1, 0]]).to_4x4()
-        world_rot = (
-            mathutils.Matrix.Rotation(math.radians(180.0), 4, 'Y').to_quaternion()
-            @ mathutils.Matrix.Rotation(math.radians(90.0), 4, 'X').to_quaternion()
-        )
-        coord_transform_inv = coord_transform.inverted()
-
         num_cams = reader.read_one('<l')
         for _ in range(num_cams):
             cam_name = reader.read_str()
-            pos = reader.read_struct('<3f')
-            rot = reader.read_struct('<4f')
-            fov, clip_start, clip_end = reader.read_struct('<3f')
-            focus_point = reader.read_struct('<3f')
+            pos = reader.unpack(STRUCT_3F)
+            rot = reader.unpack(STRUCT_4F)
+            fov, clip_start, clip_end = reader.unpack(STRUCT_3F)
+            focus_point = reader.unpack(STRUCT_3F)
 
-            transform = coord_transform_inv @ mathutils.Matrix.LocRotScale(
+            transform = CAMERA_COORD_TRANSFORM_INV @ mathutils.Matrix.LocRotScale(
                 mathutils.Vector(pos),
-                mathutils.Quaternion([rot[3], *rot[:3]]) @ world_rot,
+                mathutils.Quaternion([rot[3], *rot[:3]]) @ CAMERA_WORLD_ROT,
                 None,
-            ) @ coord_transform
+            ) @ CAMERA_COORD_TRANSFORM
 
             focus_obj = bpy.data.objects.new(f'{cam_name}_focus', None)
             cameras_collection.objects.link(focus_obj)
@@ -660,42 +860,38 @@ class WhmLoader:
         # ---< BONES >---
 
         num_bones = reader.read_one('<l')  # -- Read Number Of Bones
+        pose_bones = {b.name: b for b in self.armature_obj.pose.bones}
         for bone_idx in range(num_bones):  # -- Read Bones
             bone_name = reader.read_str()  # -- Read Bone Name
-            bone = self.armature_obj.pose.bones.get(bone_name)
+            bone = pose_bones.get(bone_name)
             if bone is None:
                 self.messages.append(('WARNING', f'Animation "{animation_name}" uses unknown bone "{bone_name}"'))
             else:
-                orig_transform = self.bone_orig_transform[bone_name]
+                orig_transform_inv = self.bone_orig_transform[bone_name].inverted()
 
-            delta = mathutils.Matrix.Rotation(math.radians(-90.0), 4, 'Z').to_4x4()
+            location_data_path = f'pose.bones["{bone_name}"].location'
+            rotation_data_path = f'pose.bones["{bone_name}"].rotation_quaternion'
             keys_pos = reader.read_one('<l')  # -- Read Number Of Postion Keys
-            for _ in range(keys_pos):  # -- Read Postion Keys
-                frame = reader.read_one('<f') * (num_frames - 1)  # -- Read Frame Number
-                x, y, z = reader.read_struct('<3f')  # -- Read Position
-                new_transform = mathutils.Matrix.Translation(mathutils.Vector([-x, y, z]))
-                if bone is None:
-                    continue
-                new_mat = delta.inverted() @ orig_transform.inverted() @ new_transform @ delta
-                loc, *_ = new_mat.decompose()
-                bone.location = loc
-                self.armature_obj.keyframe_insert(data_path=f'pose.bones["{bone_name}"].location', frame=frame, group=bone_name)
+            pos_keys = reader.read_array(POS_KEY_DTYPE, max(keys_pos, 0))  # -- Read Frames And Positions
+            if bone is not None:
+                # Translation of BONE_AXIS_FIX_INV @ orig_transform_inv @ Translation(pos) @ BONE_AXIS_FIX
+                loc_transform = np.array(BONE_AXIS_FIX_INV @ orig_transform_inv)
+                key_locs = pos_keys['pos'] * np.array([-1, 1, 1], dtype=np.float32)
+                key_locs = key_locs @ loc_transform[:3, :3].T + loc_transform[:3, 3]
+                insert_keyframes(animation, location_data_path, pos_keys['frame'] * (num_frames - 1), key_locs, group=bone_name)
 
             keys_rot = reader.read_one('<l')  # -- Read Number Of Rotation Keys
+            rot_keys = reader.read_array(ROT_KEY_DTYPE, max(keys_rot, 0))  # -- Read Frames And Rotations X, Y, Z, W
             if bone is not None:
-                orig_rot = self.bone_orig_transform[bone_name].to_quaternion()  # FIXME
-                delta = delta.to_quaternion()
+                orig_rot_inv = self.bone_orig_transform[bone_name].to_quaternion().inverted()  # FIXME
                 bone.matrix_basis = mathutils.Matrix()
-            for _ in range(keys_rot):
-                frame = reader.read_one('<f') * (num_frames - 1)  # -- Read Frame Number
-                key_rot = reader.read_struct('<4f')  # -- Read Rotation X, Y, Z, W
-                new_transform = mathutils.Quaternion([key_rot[3], key_rot[0], -key_rot[1], -key_rot[2]])
-                if bone is None:
-                    continue
-                new_rot = delta.inverted() @ orig_rot.inverted() @ new_transform @ delta
-                new_rot.make_compatible(bone.rotation_quaternion)  # Fix random axis flipping
-                bone.rotation_quaternion = new_rot
-                self.armature_obj.keyframe_insert(data_path=f'pose.bones["{bone_name}"].rotation_quaternion', frame=frame, group=bone_name)
+                key_rots = rot_keys['rot'][:, [3, 0, 1, 2]] * np.array([1, 1, -1, -1], dtype=np.float32)
+                key_rots = quaternion_multiply(
+                    quaternion_multiply(np.array(BONE_AXIS_FIX_ROT_INV @ orig_rot_inv), key_rots),
+                    np.array(BONE_AXIS_FIX_ROT),
+                )
+                key_rots = make_quaternions_compatible(key_rots, np.array(mathutils.Quaternion()))  # Fix random axis flipping
+                insert_keyframes(animation, rotation_data_path, rot_keys['frame'] * (num_frames - 1), key_rots, group=bone_name)
             stale = not reader.read_one('<b')  # -- Read Stale Property
             # if stale == 0 then setUserProp bone "Stale" "Yes"											-- Set Stale Property
             if stale and bone is not None:
@@ -719,28 +915,25 @@ class WhmLoader:
                 reader.skip(4)  # -- Skip 4 Bytes (Unknown, zeros)
                 force_invisible = reader.read_one('<f') == 0  #-- Read ForceInvisible Property
                 force_invisible_prop_name = props.create_prop_name('force_invisible', obj_name)
-                is_invisible = False
-                if force_invisible:
-                    if obj_name not in visible_meshes:
-                        is_invisible = True
-                else:
+                if not force_invisible:
                     visible_meshes.add(obj_name)
+                is_invisible = obj_name not in visible_meshes
                 props.setup_property(self.armature_obj, force_invisible_prop_name, is_invisible)  # -- Set ForceInvisible Property
                 self.armature_obj.keyframe_insert(data_path=f'["{force_invisible_prop_name}"]', frame=0, group=obj_name)
                 prop_name = props.create_prop_name('visibility', obj_name)
+                prop_data_path = f'["{prop_name}"]'
                 # if force_invisible == 0:
                 # setup_property(self.armature_obj, prop_name, force_invisible, default=1.0, min=0, max=1, description='Hack for animatiing mesh visibility')
                 # self.armature_obj.keyframe_insert(data_path=f'["{prop_name}"]', frame=0, group=obj_name)
 
                 if keys_vis:
                     props.setup_property(self.armature_obj, prop_name, 1.0)
-                    self.armature_obj.keyframe_insert(data_path=f'["{prop_name}"]', frame=0, group=obj_name)
-                
-                for j in range(keys_vis):  # -- Read Visibility Keys
-                    frame = reader.read_one('<f') * (num_frames - 1)  # -- Read Frame Number
-                    key_vis = reader.read_one('<f')  # -- Read Visibility
-                    self.armature_obj[prop_name] = key_vis
-                    self.armature_obj.keyframe_insert(data_path=f'["{prop_name}"]', frame=frame, group=obj_name)
+                    self.visibility_props.add(prop_name)
+                vis_keys = reader.read_array(SCALAR_KEY_DTYPE, max(keys_vis, 0))  # -- Read Frames And Visibility
+                if keys_vis:
+                    key_frames = np.concatenate([[0], vis_keys['frame'] * (num_frames - 1)])
+                    key_values = np.concatenate([[1.0], vis_keys['value']])
+                    insert_keyframes(animation, prop_data_path, key_frames, key_values, group=obj_name)
             elif mode == 0:  # -- Texture
                 reader.skip(4)  # -- Skip 4 Bytes (Unknown, zeros)
                 tex_anim_type = reader.read_one('<l')  # -- 1-U 2-V 3-TileU 4-TileV
@@ -753,86 +946,54 @@ class WhmLoader:
                     else:
                         prop_name = props.create_prop_name('uv_tiling', material.name)
                         props.setup_property(self.armature_obj, prop_name, [1., 1.])
+                    prop_data_path = f'["{prop_name}"]'
                 else:
                     self.messages.append(('WARNING', f'Cannot find loaded material "{obj_name}"'))
-                for j in range(keys_tex):  # -- Read Texture Keys
-                    frame = reader.read_one('<f') * (num_frames - 1)  # -- Read Frame Number
-                    key_tex = reader.read_one('<f')
-                    if material is None:
-                        continue
-                    match tex_anim_type:
-                        case 1:
-                            self.armature_obj[prop_name][0] = key_tex
-                            self.armature_obj.keyframe_insert(data_path=f'["{prop_name}"]', frame=frame, group=prop_name, index=0)
-                        case 2:
-                            self.armature_obj[prop_name][1] = -key_tex
-                            self.armature_obj.keyframe_insert(data_path=f'["{prop_name}"]', frame=frame, group=prop_name, index=1)
-                        case 3:
-                            self.messages.append(('INFO', 'TEST UV_TILING 1'))
-                            self.armature_obj[prop_name][0] = -key_tex
-                            self.armature_obj.keyframe_insert(data_path=f'["{prop_name}"]', frame=frame, group=prop_name, index=0)
-                        case 4:
-                            self.messages.append(('INFO', 'TEST UV_TILING 2'))
-                            self.armature_obj[prop_name][1] = -key_tex
-                            self.armature_obj.keyframe_insert(data_path=f'["{prop_name}"]', frame=frame, group=prop_name, index=1)
+                match tex_anim_type:
+                    case 1: key_index, key_sign = 0, 1
+                    case 2: key_index, key_sign = 1, -1
+                    case 3: key_index, key_sign = 0, -1
+                    case 4: key_index, key_sign = 1, -1
+                    case _: key_index, key_sign = None, 0
+                if material is not None and keys_tex > 0 and tex_anim_type in (3, 4):
+                    self.messages.append(('INFO', f'TEST UV_TILING {tex_anim_type - 2}'))
+                tex_keys = reader.read_array(SCALAR_KEY_DTYPE, max(keys_tex, 0))  # -- Read Frames And Texture Values
+                if material is not None and key_index is not None:
+                    insert_keyframes(animation, prop_data_path, tex_keys['frame'] * (num_frames - 1), key_sign * tex_keys['value'], group=prop_name, index=key_index)
         # ---< CAMERA >---
 
         if current_chunk.version >= 2:  # -- Read Camera Data If DATADATA Chunk Version 2
 
-            coord_transform = mathutils.Matrix([[-1, 0, 0], [0, 0, 1], [0, -1, 0]]).to_quaternion()
-            world_rot = (
-                mathutils.Matrix.Rotation(math.radians(180.0), 4, 'Y').to_quaternion()
-                @ mathutils.Matrix.Rotation(math.radians(90.0), 4, 'X').to_quaternion()
-            )
-            coord_transform_inv = coord_transform.inverted()
-
             num_cams = reader.read_one('<l')  # -- Read Number Of Cameras
             for cam_idx in range(num_cams):  # -- Read Cameras
                 cam_name = reader.read_str()  # -- Read Camera Name
+                location_data_path = f'pose.bones["{cam_name}"].location'
+                rotation_data_path = f'pose.bones["{cam_name}"].rotation_quaternion'
                 bone = self.animated_cameras.get(cam_name)
-                orig_transform = self.bone_orig_transform.get(cam_name)
+                is_created = cam_name in self.created_cameras
                 cam_pos_keys = reader.read_one('<l')  # -- Read Number Of Camera Position Keys (?)
-                for _ in range(cam_pos_keys):
-                    frame = reader.read_one('<f') * (num_frames - 1)  # -- Read Frame Number
-                    x, z, y = reader.read_struct('<3f')
-                    if cam_name not in self.created_cameras:
-                        continue
-                    if bone is None:
-                        bone = self.attach_camera_to_armature(cam_name)
-                        self.animated_cameras[cam_name] = bone
-                        orig_transform = self.bone_orig_transform[cam_name]
-                    new_transform = mathutils.Matrix.Translation(mathutils.Vector([-x, -y, z]))
-
-                    new_mat = orig_transform.inverted() @ new_transform
-                    loc, *_ = new_mat.decompose()
-                    bone.location = loc
-                    self.armature_obj.keyframe_insert(data_path=f'pose.bones["{cam_name}"].location', frame=frame, group=bone_name)
+                if is_created and cam_pos_keys > 0 and bone is None:
+                    bone = self.animated_cameras[cam_name] = self.attach_camera_to_armature(cam_name)
+                cam_pos_data = reader.read_array(POS_KEY_DTYPE, max(cam_pos_keys, 0))  # -- Read Frames And Positions
+                if is_created and cam_pos_keys > 0:
+                    loc_transform = np.array(self.bone_orig_transform[cam_name].inverted())
+                    key_locs = cam_pos_data['pos'][:, [0, 2, 1]] * COORD_FLIP
+                    key_locs = key_locs @ loc_transform[:3, :3].T + loc_transform[:3, 3]
+                    insert_keyframes(animation, location_data_path, cam_pos_data['frame'] * (num_frames - 1), key_locs, group=cam_name)
 
                 cam_rot_keys = reader.read_one('<l')  # -- Read Number Of Camera Rotation Keys (?)
-                if orig_transform is not None:
-                    orig_rot = orig_transform.to_quaternion()  # FIXME
-                for _ in range(cam_rot_keys):
-                    frame = reader.read_one('<f') * (num_frames - 1)  # -- Read Frame Number
-                    key_rot = reader.read_struct('<4f')
-                    if cam_name not in self.created_cameras:
-                        continue
-                    if bone is None:
-                        bone = self.attach_camera_to_armature(cam_name)
-                        self.animated_cameras[cam_name] = bone
-                        orig_transform = self.bone_orig_transform[cam_name]
-                        orig_rot = orig_transform.to_quaternion()  # FIXME
-
-                    new_transform = (
-                        coord_transform_inv
-                        @ mathutils.Quaternion([key_rot[3], *key_rot[:3]])
-                        @ world_rot
-                        @ coord_transform
-                     )
-
-                    new_rot = orig_rot.inverted() @ new_transform
-                    new_rot.make_compatible(bone.rotation_quaternion)  # Fix random axis flipping
-                    bone.rotation_quaternion = new_rot
-                    self.armature_obj.keyframe_insert(data_path=f'pose.bones["{cam_name}"].rotation_quaternion', frame=frame, group=bone_name)
+                if is_created and cam_rot_keys > 0 and bone is None:
+                    bone = self.animated_cameras[cam_name] = self.attach_camera_to_armature(cam_name)
+                cam_rot_data = reader.read_array(ROT_KEY_DTYPE, max(cam_rot_keys, 0))  # -- Read Frames And Rotations X, Y, Z, W
+                if is_created and cam_rot_keys > 0:
+                    orig_rot_inv = self.bone_orig_transform[cam_name].to_quaternion().inverted()  # FIXME
+                    key_rots = quaternion_multiply(
+                        quaternion_multiply(np.array(orig_rot_inv @ CAMERA_COORD_ROT_INV), cam_rot_data['rot'][:, [3, 0, 1, 2]]),
+                        np.array(CAMERA_WORLD_ROT @ CAMERA_COORD_ROT),
+                    )
+                    key_rots = make_quaternions_compatible(key_rots, np.array(bone.rotation_quaternion))  # Fix random axis flipping
+                    bone.rotation_quaternion = key_rots[-1]  # -- seeds make_compatible for the next animation
+                    insert_keyframes(animation, rotation_data_path, cam_rot_data['frame'] * (num_frames - 1), key_rots, group=cam_name)
         # ---< DATAANBV >---
 
         current_chunk = reader.read_header('DATAANBV')
@@ -867,55 +1028,44 @@ class WhmLoader:
         vertex_size_id = reader.read_one('<l')  # 37 or 39
         self.ensure((num_skin_bones != 0) * 2 == vertex_size_id - 37, f'Mesh "{mesh_name}": {num_skin_bones=} and {vertex_size_id=}')
 
-        vert_array = []       # -- array to store vertex data
-        for _ in range(num_vertices):
-            x, z, y = reader.read_struct('<3f')
-            vert_array.append((-x, -y, z))
+        vert_array = reader.read_array(VEC3_DTYPE, num_vertices)[:, [0, 2, 1]] * COORD_FLIP  # -- array to store vertex data
 
         #---< SKIN >---
 
-        skin_vert_array = []  # -- array to store skin vertices
+        skin_bone_names = []  # -- names of bones referenced by skin_bone_ids
+        skin_bone_ids = np.full((num_vertices, 4), -1, dtype=np.int32)
+        skin_weights = np.zeros((num_vertices, 4), dtype=np.float32)
         if num_skin_bones:
-            skin_data_warn = False
-            for _ in range(num_vertices):
-                skin_vert = SkinVertice()  # -- Reset Structure
-                skin_vert.weights[:3] = reader.read_struct('<3f')  # -- Read 1st, 2nd and 3rd Bone Weight
-                skin_vert.weights[3] = 1 - sum(skin_vert.weights[:3])  # -- Calculate 4th Bone Weight
-
-                # -- Read Bones
-                for bone_slot in range(4):
-                    bone_idx = reader.read_one('<B')
-                    if bone_idx == 255:
-                        skin_vert.bone[bone_slot] = None
+            skin_data = reader.read_array(SKIN_VERTEX_DTYPE, num_vertices)  # -- Read 1st, 2nd and 3rd Bone Weight and Bones
+            skin_weights[:, :3] = skin_data['weights']
+            skin_bone_idx = skin_data['bones']
+            skin_weights[:, 3] = 1 - skin_weights[:, :3].sum(axis=1)  # -- Calculate 4th Bone Weight
+
+            bone_name_ids = {}
+            bone_idx_to_id = np.full(256, -1, dtype=np.int32)  # -- 255 means no bone
+            for bone_idx in range(255):
+                bone_name = idx_to_bone_name.get(bone_idx)
+                if bone_name is None:
+                    if bone_idx >= len(bone_array):
                         continue
-                    bone_name = idx_to_bone_name.get(bone_idx)
-                    if bone_name is None:
-                        if bone_idx >= len(bone_array):
-                            if not skin_data_warn:
-                                self.messages.append(('WARNING', f'Mesh "{mesh_name}": bone index {bone_idx} (slot {bone_slot}) is out of range ({len(bone_array) - 1})'))
-                                skin_data_warn = True
-                            skin_vert.bone[bone_slot] = None
-                            continue
-                        bone_name = bone_array[bone_idx].name
-                    skin_vert.bone[bone_slot] = bone_name
-
-                # -- Add Vertex To Array
-                skin_vert_array.append(skin_vert)
+                    bone_name = bone_array.names[bone_idx]
+                bone_idx_to_id[bone_idx] = bone_name_ids.setdefault(bone_name, len(bone_name_ids))
+            skin_bone_names = list(bone_name_ids)
+            skin_bone_ids = bone_idx_to_id[skin_bone_idx]
+            unknown_bones = np.argwhere((skin_bone_idx != 255) & (skin_bone_ids == -1))
+            if len(unknown_bones):
+                vert_idx, bone_slot = unknown_bones[0]
+                self.messages.append(('WARNING', f'Mesh "{mesh_name}": bone index {skin_bone_idx[vert_idx, bone_slot]} (slot {bone_slot}) is out of range ({len(bone_array) - 1})'))
 
         #---< NORMALS >---
 
-        normal_array = []     # -- array to store normal data
-        for _ in range(num_vertices):
-            x, z, y = reader.read_struct('<3f')
-            normal_array.append(mathutils.Vector([-x, -y, z]))
+        normal_array = reader.read_array(VEC3_DTYPE, num_vertices)[:, [0, 2, 1]] * COORD_FLIP  # -- array to store normal data
 
         #---< UVW MAP >---
 
         face_array = []       # -- array to store face data
-        uv_array = []        # -- array to store texture coordinates
-        for _ in range(num_vertices):
-            u, v = reader.read_struct('<2f')
-            uv_array.append([u, 1 - v])
+        uv_array = reader.read_array(VEC2_DTYPE, num_vertices).astype(np.float32)  # -- array to store texture coordinates
+        uv_array[:, 1] = 1 - uv_array[:, 1]
 
         #-- skip to texture path
         unk_bytes = reader.read_struct('<4B')  # -- skip 4 bytes (unknown, zeros)
@@ -938,52 +1088,39 @@ class WhmLoader:
             num_faces = reader.read_one('<l') // 3  # -- faces are given as a number of vertices that makes them - divide by 3
 
             #-- read faces connected with this material
-            mat_faces = []
-            for __ in range(num_faces):
-                x, z, y = reader.read_struct('<3H')
-                mat_faces.append((x, y, z))
-                if material:
-                    matid_array.append(len(materials) - 1)
-                else:
-                    matid_array.append(0)  # Default material
-            face_array.extend(mat_faces)
+            mat_faces = reader.read_array(FACE_DTYPE, num_faces)[:, [0, 2, 1]]
+            matid_array.append(np.full(num_faces, len(materials) - 1 if material else 0, dtype=np.int32))  # 0 is the default material
+            face_array.append(mat_faces)
             # -- Skip 8 Bytes To Next Texture Name Length. 4 data bytes + 4 zeros
-            data_min_vertex_idx, data_vertex_cnt, bytes_zero = reader.read_struct('<2Hl')
-            real_min_vertex_idx = min((i for t in mat_faces for i in t), default=0)
-            real_vertex_cnt = max((i for t in mat_faces for i in t), default=0) + 1 - real_min_vertex_idx
-            self.ensure(bytes_zero == 0, f'Mesh "{mesh_name}:{texture_path}" has non-zero flags: {bytes_zero}', level='INFO')
-            self.ensure(data_min_vertex_idx == real_min_vertex_idx, f'Mesh "{mesh_name}:{texture_path}" min_vertex_idx: {data_min_vertex_idx} != {real_min_vertex_idx}')
-            self.ensure(data_vertex_cnt == real_vertex_cnt, f'Mesh "{mesh_name}:{texture_path}" vertex_cnt: {data_vertex_cnt} != {real_vertex_cnt}')
-
+            data_min_vertex_idx, data_vertex_cnt, bytes_zero = reader.unpack(STRUCT_FACE_RANGE)
+            real_min_vertex_idx = int(mat_faces.min()) if num_faces else 0
+            real_vertex_cnt = int(mat_faces.max(initial=0)) + 1 - real_min_vertex_idx
+            self.ensure(bytes_zero == 0, 'Mesh "%s:%s" has non-zero flags: %s', mesh_name, texture_path, bytes_zero, level='INFO')
+            self.ensure(data_min_vertex_idx == real_min_vertex_idx, 'Mesh "%s:%s" min_vertex_idx: %s != %s', mesh_name, texture_path, data_min_vertex_idx, real_min_vertex_idx)
+            self.ensure(data_vertex_cnt == real_vertex_cnt, 'Mesh "%s:%s" vertex_cnt: %s != %s', mesh_name, texture_path, data_vertex_cnt, real_vertex_cnt)
+
+        face_array = np.concatenate(face_array, dtype=np.int32) if face_array else np.empty((0, 3), dtype=np.int32)
+        matid_array = np.concatenate(matid_array) if matid_array else np.empty(0, dtype=np.int32)
         self.ensure(num_polygons == len(face_array), f'Mesh "{mesh_name}": {num_polygons} != {len(face_array)}')
 
         #---< SHADOW VOLUME >---
 
         num_shadow_vertices = reader.read_one('<L')  # -- zero is ok
-        shadow_vertices = []
-        for _ in range(num_shadow_vertices):
-            x, z, y = reader.read_struct('<3f')
-            shadow_vertices.append((-x, -y, z))
+        shadow_vertices = reader.read_array(VEC3_DTYPE, num_shadow_vertices)[:, [0, 2, 1]] * COORD_FLIP
 
         num_shadow_faces = reader.read_one('<L')  # -- zero is ok
-        shadow_faces = []
-        shadow_face_normals = []
-        for _ in range(num_shadow_faces):
-            norm_x, norm_z, norm_y, x, z, y = reader.read_struct('<3f3L')
-            shadow_faces.append((x, y, z))
-            shadow_face_normals.append((-norm_x, -norm_y, norm_z))
+        shadow_face_data = reader.read_array(SHADOW_FACE_DTYPE, num_shadow_faces)
+        shadow_faces = shadow_face_data['verts'][:, [0, 2, 1]]
+        shadow_face_normals = shadow_face_data['normal'][:, [0, 2, 1]] * COORD_FLIP
 
         num_shadow_edges = reader.read_one('<L')  # -- zero is ok
-        shadow_edges = []
-        for _ in range(num_shadow_edges):
-            # vert1, vert2, face1, face2, vert_pos1, vert_pos2
-            shadow_edges.append(reader.read_struct('<4L6f'))
+        shadow_edges = reader.read_array(SHADOW_EDGE_DTYPE, num_shadow_edges)
 
         #---< DATABVOL CHUNK >---
 
         current_chunk = reader.read_header('DATABVOL')
         bbox_flag, *bbox_center = reader.read_struct('<b3f')
-        bbox_size = reader.read_struct('<3f')
+        bbox_size = reader.unpack(STRUCT_3F)
         bbox_rot_mat = reader.read_struct('<9f')
 
         #---------------------
@@ -992,8 +1129,16 @@ class WhmLoader:
 
         #---< CREATE MESH >---
 
-        new_mesh = bpy.data.meshes.new(mesh_name)
-        new_mesh.from_pydata(vert_array, [], face_array)  # -- Create New Mesh
+        new_mesh = bpy.data.meshes.new(mesh_name)  # -- Create New Mesh
+        faces = face_array
+        new_mesh.vertices.add(num_vertices)
+        new_mesh.attributes['position'].data.foreach_set('vector', vert_array.ravel())
+        new_mesh.loops.add(faces.size)
+        new_mesh.loops.foreach_set('vertex_index', faces.ravel())
+        new_mesh.polygons.add(len(faces))
+        new_mesh.polygons.foreach_set('loop_start', np.arange(0, faces.size, 3, dtype=np.int32))
+        new_mesh.update(calc_edges=True)
+        new_mesh.shade_flat()  # -- from_pydata default
 
         # TODO capture output
         # Note: redirect_stdout doesn't work. See https://eli.thegreenplace.net/2015/redirecting-all-kinds-of-stdout-in-python/
@@ -1005,7 +1150,7 @@ class WhmLoader:
         #---< MESH PROPERTIES >---
 
         #new_mesh.wireColor = (color 28 89 177)												-- Set Color (Blue)
-        new_mesh.normals_split_custom_set_from_vertices(normal_array)
+        new_mesh.normals_split_custom_set_from_vertices(normal_array)  # -- contiguous float32 buffer
         
         for mat in materials:  # -- Set Material
             new_mesh.materials.append(mat)
@@ -1020,115 +1165,116 @@ class WhmLoader:
 
         #---< SET BONE MESH >---
 
-        vertex_groups = {}
-        for vert_idx, vert in enumerate(skin_vert_array):
-            for bone_weight, bone_name in zip(vert.weights, vert.bone):
-                if bone_name is None or bone_weight == 0:
-                    continue
-                vertex_group =  vertex_groups.get(bone_name)
-                if vertex_group is None:
-                    vertex_group = vertex_groups[bone_name] = obj.vertex_groups.new(name=bone_name)
-                vertex_group.add([vert_idx], bone_weight, 'REPLACE')
+        skin_weight_groups = list(group_skin_weights(skin_bone_ids, skin_weights))
+        vertex_groups = [None] * len(skin_bone_names)  # -- indexed by skin bone id
+        for bone_id, *_ in skin_weight_groups:
+            if vertex_groups[bone_id] is None:
+                vertex_groups[bone_id] = obj.vertex_groups.new(name=skin_bone_names[bone_id])
+        for bone_id, bone_weight, vert_indices in skin_weight_groups:
+            vertex_groups[bone_id].add(vert_indices.tolist(), bone_weight, 'REPLACE')
 
         #---< UV MAP >---
 
         uv_layer = new_mesh.uv_layers.new()
-        
-        # From https://blenderartists.org/t/importing-uv-coordinates/595872/5
-
-        #initialize an empty list
-        per_loop_list = [0.0] * len(new_mesh.loops)
-
-        for loop in new_mesh.loops:
-            per_loop_list[loop.index] = uv_array[loop.vertex_index]
-
-        # flattening
-        per_loop_list = [uv for pair in per_loop_list for uv in pair]
-
-        uv_layer.data.foreach_set('uv', per_loop_list)  # -- Set UVW Coordinates
+        if has_errors:  # -- validate() may have removed some loops
+            loop_vertex_idx = np.empty(len(new_mesh.loops), dtype=np.int32)
+            new_mesh.loops.foreach_get('vertex_index', loop_vertex_idx)
+        else:
+            loop_vertex_idx = faces.ravel()
+        uv_layer.data.foreach_set('uv', uv_array[loop_vertex_idx].ravel())  # -- Set UVW Coordinates
 
-        if self.blender_mesh_root is None:
-            self.blender_mesh_root = bpy.data.collections.new('Meshes')
-            self.model_root_collection.children.link(self.blender_mesh_root)
         if group_name:
             extra_collection = bpy.data.collections.get(group_name)
             if extra_collection is None:
                 extra_collection = bpy.data.collections.new(group_name)
                 self.model_root_collection.children.link(extra_collection)
             extra_collection.objects.link(obj)
-        armature_mod = obj.modifiers.new('Skeleton', 'ARMATURE')
-        armature_mod.object = self.armature_obj
-        self.blender_mesh_root.objects.link(obj)
+        self.skinned_objects.append(obj)
+        self.mesh_objects.append(obj)
 
-        if shadow_faces:
+        if len(shadow_faces):
             shadow_mesh_name = f'{mesh_name}_shadow'
             shadow_mesh = bpy.data.meshes.new(shadow_mesh_name)
-            shadow_mesh.from_pydata(shadow_vertices, [i[:2] for i in shadow_edges], shadow_faces)
-            for face, expected_normal in zip(shadow_mesh.polygons, shadow_face_normals):
-                if face.normal.dot(expected_normal) < 0:
-                    face.flip()
+            shadow_mesh.vertices.add(len(shadow_vertices))
+            shadow_mesh.attributes['position'].data.foreach_set('vector', shadow_vertices.ravel())
+            shadow_mesh.edges.add(len(shadow_edges))
+            shadow_mesh.edges.foreach_set('vertices', shadow_edges['verts'].astype(np.int32).ravel())
+            shadow_mesh.loops.add(shadow_faces.size)
+            shadow_mesh.loops.foreach_set('vertex_index', shadow_faces.astype(np.int32).ravel())
+            shadow_mesh.polygons.add(len(shadow_faces))
+            shadow_mesh.polygons.foreach_set('loop_start', np.arange(0, shadow_faces.size, 3, dtype=np.int32))
+            shadow_mesh.update(calc_edges=True)
+            shadow_mesh.shade_flat()  # -- from_pydata default
+            shadow_polygon_normals = np.empty(len(shadow_faces) * 3, dtype=np.float32)
+            shadow_mesh.polygons.foreach_get('normal', shadow_polygon_normals)
+            normal_dots = (shadow_polygon_normals.reshape(-1, 3) * shadow_face_normals).sum(axis=1)
+            for face_idx in np.flatnonzero(normal_dots < 0).tolist():
+                shadow_mesh.polygons[face_idx].flip()
 
             shadow_obj = bpy.data.objects.new(shadow_mesh_name, shadow_mesh)
             if self.blender_shadow_mesh_root is None:
                 self.blender_shadow_mesh_root = bpy.data.collections.new('Shadows')
                 self.model_root_collection.children.link(self.blender_shadow_mesh_root)
-                layer_collection = bpy.context.view_layer.layer_collection.children[self.model_root_collection.name].children['Shadows']
-                layer_collection.hide_viewport = True
-            shadow_armature_mod = shadow_obj.modifiers.new('Skeleton', 'ARMATURE')
-            shadow_armature_mod.object = self.armature_obj
+            self.skinned_objects.append(shadow_obj)
             self.blender_shadow_mesh_root.objects.link(shadow_obj)
             obj.dow_shadow_mesh = shadow_obj
         return obj
 
     def CH_DATADATA(self, reader: ChunkReader):  # - Chunk Handler - Sub Chunk Of FOLDMSGR - Mesh List
         num_meshes = reader.read_one('<l')  # -- Read Number Of Meshes
-        loaded_messages = set()
-        for i in range(num_meshes):  # -- Read Each Mesh
+        mesh_entries = []
+        for _ in range(num_meshes):  # -- Read Each Mesh
             mesh_name = reader.read_str()  # -- Read Mesh Name
-            mesh_path: pathlib.Path = pathlib.Path(reader.read_str())  # -- Read Mesh Path
-            if mesh_path and mesh_path != pathlib.Path(''):
+            mesh_path = reader.read_str()  # -- Read Mesh Path
+            mesh_parent_idx = reader.read_one('<l')  # -- Read Mesh Parent
+            mesh_entries.append((mesh_name, mesh_path, mesh_parent_idx))
+
+        loaded_messages = set()
+        for mesh_name, mesh_path, mesh_parent_idx in mesh_entries:
+            mesh_key = mesh_name.lower()
+            if mesh_path not in ('', '.'):
+                mesh_path = pathlib.Path(mesh_path)
                 self.loaded_resource_stats['attempted'] += 1
                 filename = mesh_path.with_suffix('.whm')
-                file_data = self.layout.find(filename)
+                file_data = self.find_file(filename)
                 if file_data:
                     if mesh_path not in loaded_messages:
                         loaded_messages.add(mesh_path)
                         self.messages.append(('INFO', f'Loading {mesh_path}'))
-                    xreffile = open_reader(file_data)
-                    xreffile.skip_relic_chunky()
-                    chunk = xreffile.read_header('DATAFBIF')  # -- Read 'File Burn Info' Header
-                    xreffile.skip(chunk.size)  # -- Skip 'File Burn Info' Chunk
-                    chunk = xreffile.read_header('FOLDRSGM')	# -- Skip 'Folder SGM' Header
-                    group_name = f'xref_{chunk.name}'
-                    for current_chunk in xreffile.iter_chunks():  # -- Read Chunks Until End Of File
-                        match current_chunk.typeid:
-                            case 'DATASSHR': self.CH_DATASSHR(xreffile)  # -- DATASSHR - Texture Data
-                            case 'DATASKEL': self.CH_DATASKEL(xreffile, xref=True)  # -- FOLDMSLC - Skeleton Data
-                            case 'FOLDMSGR':  # -- Read FOLDMSLC Chunks
-                                for current_chunk in xreffile.iter_chunks():  # -- Read FOLDMSLC Chunks
-                                    if current_chunk.typeid == 'FOLDMSLC' and current_chunk.name.lower() == mesh_name.lower():
-                                        mesh_obj = self.CH_FOLDMSLC(xreffile, mesh_name, xref=True, group_name=group_name)
-                                        props.setup_property(mesh_obj, 'xref_source', str(mesh_path))
-                                    else:
-                                        xreffile.skip(current_chunk.size)
-                                    if current_chunk.typeid == 'DATABVOL':
-                                        break
-                            # case 'DATAMARK': self.CH_DATAMARK(xreffile)
-                            case _: xreffile.skip(current_chunk.size)
+                    with open_reader(file_data) as xreffile:
+                        xreffile.skip_relic_chunky()
+                        chunk = xreffile.read_header('DATAFBIF')  # -- Read 'File Burn Info' Header
+                        xreffile.skip(chunk.size)  # -- Skip 'File Burn Info' Chunk
+                        chunk = xreffile.read_header('FOLDRSGM')	# -- Skip 'Folder SGM' Header
+                        group_name = f'xref_{chunk.name}'
+                        for current_chunk in xreffile.iter_chunks():  # -- Read Chunks Until End Of File
+                            match current_chunk.typeid:
+                                case 'DATASSHR': self.CH_DATASSHR(xreffile)  # -- DATASSHR - Texture Data
+                                case 'DATASKEL': self.CH_DATASKEL(xreffile, xref=True)  # -- FOLDMSLC - Skeleton Data
+                                case 'FOLDMSGR':  # -- Read FOLDMSLC Chunks
+                                    for current_chunk in xreffile.iter_chunks():  # -- Read FOLDMSLC Chunks
+                                        if current_chunk.typeid == 'FOLDMSLC' and current_chunk.name.lower() == mesh_key:
+                                            mesh_obj = self.CH_FOLDMSLC(xreffile, mesh_name, xref=True, group_name=group_name)
+                                            props.setup_property(mesh_obj, 'xref_source', str(mesh_path))
+                                        else:
+                                            xreffile.skip(current_chunk.size)
+                                        if current_chunk.typeid == 'DATABVOL':
+                                            break
+                                # case 'DATAMARK': self.CH_DATAMARK(xreffile)
+                                case _: xreffile.skip(current_chunk.size)
                 else:
                     self.messages.append(('WARNING', f'Cannot find file {filename}'))
                     self.loaded_resource_stats['errors'] += 1
-            mesh_parent_idx = reader.read_one('<l')  # -- Read Mesh Parent
             if mesh_parent_idx != -1:
-                mesh = self.created_meshes.get(mesh_name.lower())
+                mesh = self.created_meshes.get(mesh_key)
                 if mesh is None:
                     continue
-                bone_name = self.bone_array[mesh_parent_idx].name
+                bone_name = self.bone_array.names[mesh_parent_idx]
                 mesh.vertex_groups.new(name=bone_name).add(
-                    list(range(len(mesh.data.vertices))), 1.0, 'REPLACE')
+                    range(len(mesh.data.vertices)), 1.0, 'REPLACE')
                 if (shadow_mesh := mesh.dow_shadow_mesh) is not None:
                     shadow_mesh.vertex_groups.new(name=bone_name).add(
-                        list(range(len(shadow_mesh.data.vertices))), 1.0, 'REPLACE')
+                        range(len(shadow_mesh.data.vertices)), 1.0, 'REPLACE')
     
     def load(self, reader: ChunkReader):
         self._reset()
@@ -1139,33 +1285,51 @@ class WhmLoader:
         self.model_root_collection = bpy.data.collections.new(header.name)
         self.bpy_context.scene.collection.children.link(self.model_root_collection)
         self.model_root_collection.objects.link(self.armature_obj)
+        self.blender_mesh_root = bpy.data.collections.new('Meshes')
+        self.model_root_collection.children.link(self.blender_mesh_root)
 
         internal_textures = {}
 
+        def load_internal_texture(reader: ChunkReader, chunk: ChunkHeader):
+            internal_textures[chunk.name] = self.CH_FOLDTXTR(reader, chunk.name)
+
+        def load_internal_material(reader: ChunkReader, chunk: ChunkHeader):
+            mat = self.CH_FOLDSHDR(reader, chunk.name, internal_textures)
+            props.setup_property(mat, 'internal', True)
+
+        chunk_handlers = {
+            'DATASSHR': lambda reader, chunk: self.CH_DATASSHR(reader),  # DATASSHR - Texture Data
+            'FOLDTXTR': load_internal_texture,  # FOLDTXTR - Internal Texture
+            'FOLDSHDR': load_internal_material,  # FOLDSHDR - Internal Material
+            'DATASKEL': lambda reader, chunk: self.CH_DATASKEL(reader, xref=False),  # DATASKEL - Skeleton Data
+            'FOLDMSGR': lambda reader, chunk: self.CH_FOLDMSGR(reader),  # FOLDMSGR - Mesh Data
+            'DATAMARK': lambda reader, chunk: self.CH_DATAMARK(reader),  # DATAMARK - Marker Data
+            'FOLDANIM': lambda reader, chunk: self.CH_FOLDANIM(reader),  # FOLDANIM - Animations
+            'DATACAMS': lambda reader, chunk: self.CH_DATACAMS(reader),  # DATACAMS - Cameras
+        }
+
         for current_chunk in reader.iter_chunks():  # Read Chunks Until End Of File
-            match current_chunk.typeid:
-                case "DATASSHR": self.CH_DATASSHR(reader)  # DATASSHR - Texture Data
-                case "FOLDTXTR":  # FOLDTXTR - Internal Texture
-                    internal_textures[current_chunk.name] = self.CH_FOLDTXTR(reader, current_chunk.name)
-                case "FOLDSHDR":  # FOLDSHDR - Internal Material
-                    mat = self.CH_FOLDSHDR(reader, current_chunk.name, internal_textures)
-                    props.setup_property(mat, 'internal', True)
-                case "DATASKEL": self.CH_DATASKEL(reader, xref=False)  # DATASKEL - Skeleton Data
-                case "FOLDMSGR": self.CH_FOLDMSGR(reader)  # FOLDMSGR - Mesh Data
-                case "DATAMARK": self.CH_DATAMARK(reader)  # DATAMARK - Marker Data
-                case "FOLDANIM": self.CH_FOLDANIM(reader)  # FOLDANIM - Animations
-                case "DATACAMS": self.CH_DATACAMS(reader)  # DATACAMS - Cameras
-                case _:
-                    self.messages.append(('INFO', f'Skipped unknown chunk {current_chunk.typeid}'))
-                    reader.skip(current_chunk.size)  # Skipping Chunks By Default
+            handler = chunk_handlers.get(current_chunk.typeid)
+            if handler is None:
+                self.messages.append(('INFO', f'Skipped unknown chunk {current_chunk.typeid}'))
+                reader.skip(current_chunk.size)  # Skipping Chunks By Default
+                continue
+            handler(reader, current_chunk)
 
+        for obj in self.mesh_objects:
+            self.blender_mesh_root.objects.link(obj)
+        for obj in self.skinned_objects:
+            armature_mod = obj.modifiers.new('Skeleton', 'ARMATURE')
+            armature_mod.object = self.armature_obj
         if self.armature_obj.pose is not None:
-            for bone in self.armature_obj.pose.bones:
-                bone.matrix_basis = mathutils.Matrix()
+            pose_bones = self.armature_obj.pose.bones
+            pose_bones.foreach_set('matrix_basis', np.tile(np.identity(4, dtype=np.float32).ravel(), len(pose_bones)))
+        if self.blender_shadow_mesh_root is not None:
+            layer_collection = self.bpy_context.view_layer.layer_collection.children[self.model_root_collection.name].children['Shadows']
+            layer_collection.hide_viewport = True
         self.armature_obj.hide_set(True)
-        for k, _ in self.armature_obj.items():
-            if k.startswith(f'visibility{props.SEP}'):
-                self.armature_obj[k] = 1.
+        for k in self.visibility_props:
+            self.armature_obj[k] = 1.
         if self.loaded_resource_stats['errors'] == self.loaded_resource_stats['attempted'] > 1:
             self.messages.append(('INFO', f'It looks like no resources were loaded. Make sure the "Mod folder" in the Add-on properties is set correctly'))
 
@@ -1197,54 +1361,50 @@ class WhmLoader:
     def apply_teamcolor(self, teamcolor: dict):
         color_node_names = {f'color_{i}' for i in self.TEAMCOLORABLE_LAYERS}
         images = {}
-        with tempfile.TemporaryDirectory() as tmpdir:
-            tmpdir = pathlib.Path(tmpdir)
-            for key in self.TEAMCOLORABLE_IMAGES:
-                if (img_path := teamcolor.get(key)) is None:
-                    continue
-                data_path = pathlib.Path(img_path)
-                if not data_path.exists():
-                    data_path = self.layout.find(data_path)
-                if not data_path:
-                    continue
-                tmpfile = tmpdir / pathlib.Path(img_path).name
-                tmpfile.write_bytes(data_path.read_bytes())
-                images[key] = image = bpy.data.images.load(str(tmpfile))
-                image.pack()
+        for key in self.TEAMCOLORABLE_IMAGES:
+            if (img_path := teamcolor.get(key)) is None:
+                continue
+            data_path = pathlib.Path(img_path)
+            if not data_path.exists():
+                data_path = self.layout.find(data_path)
+            if not data_path:
+                continue
+            images[key] = utils.load_packed_image(pathlib.Path(img_path).name, data_path.read_bytes())
         for mat in bpy.data.materials:
             if mat.node_tree is None:
                 continue
             for node in mat.node_tree.nodes:
-                if node.bl_idname == 'ShaderNodeValToRGB' and node.label in color_node_names:
-                    key = node.label[len('color_'):]
-                    if teamcolor.get(key) is None:
-                        continue
-                    node.color_ramp.elements[-1].color[:3] = teamcolor[key][:3]
-                    continue
-                if node.bl_idname == 'ShaderNodeTexImage' and node.label in self.TEAMCOLORABLE_IMAGES and images.get(node.label) is not None:
-                    node.image = images[node.label]
+                match node.bl_idname:  # -- read each node type once, most nodes are neither
+                    case 'ShaderNodeValToRGB':
+                        label = node.label
+                        if label not in color_node_names or (color := teamcolor.get(label[len('color_'):])) is None:
+                            continue
+                        node.color_ramp.elements[-1].color[:3] = color[:3]
+                    case 'ShaderNodeTexImage':
+                        if (image := images.get(node.label)) is not None:  # -- images only has TEAMCOLORABLE_IMAGES keys
+                            node.image = image
 
 
 def import_whm(module_root: pathlib.Path, target_path: pathlib.Path, teamcolor_path: pathlib.Path = None):
-    print('------------------')
+    if DEBUG:
+        print('------------------')
+    if teamcolor_path and not pathlib.Path(teamcolor_path).is_file():  # -- fail before wiping the scene
+        raise FileNotFoundError(teamcolor_path)
 
-    for action in bpy.data.actions:
-        bpy.data.actions.remove(action)
-
-    for material in bpy.data.materials:
+    blend_data = bpy.data
+    for material in blend_data.materials:
         material.user_clear()
-        bpy.data.materials.remove(material)
-    
-    for image in bpy.data.images:
-        bpy.data.images.remove(image)
-
-    for mesh in bpy.data.meshes:
-        bpy.data.meshes.remove(mesh)
-
-    for cam in bpy.data.cameras:
-        bpy.data.cameras.remove(cam)
-
-    with target_path.open('rb') as f:
+    old_ids = [
+        *blend_data.actions,
+        *blend_data.materials,
+        *blend_data.images,
+        *blend_data.meshes,
+        *blend_data.cameras,
+    ]
+    if old_ids:  # -- nothing to clean up in a fresh scene
+        blend_data.batch_remove(old_ids)
+
+    with open_model_file(target_path) as f, operators.rename_listener_suspended():
         reader = ChunkReader(f)
         loader = WhmLoader(module_root, load_wtp=teamcolor_path is not None)
         try:
@@ -1252,6 +1412,7 @@ def import_whm(module_root: pathlib.Path, target_path: pathlib.Path, teamcolor_p
             if teamcolor_path:
                 teamcolor = loader.load_teamcolor(teamcolor_path)
                 loader.apply_teamcolor(teamcolor)
+            operators.init_nameprops()
         finally:
-            for _, msg in loader.messages:
-                print(msg)
+            if loader.messages:
+                print('\n'.join(msg for _, msg in loader.messages))  # -- console_write splits the lines
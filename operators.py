@@ -1,3 +1,5 @@
+import contextlib
+
 import bpy
 import mathutils
 
@@ -514,6 +516,20 @@ def rename_listener(scene, depsgraph):
                             fcurve.data_path = fcurve.data_path.replace(rename_from, rename_to)
 
 
+@contextlib.contextmanager
+def rename_listener_suspended():
+    # -- Bulk imports create thousands of IDs, init_nameprops syncs the names afterwards
+    handlers = bpy.app.handlers.depsgraph_update_post
+    is_registered = rename_listener in handlers
+    if is_registered:
+        handlers.remove(rename_listener)
+    try:
+        yield
+    finally:
+        if is_registered:
+            handlers.append(rename_listener)
+
+
 @bpy.app.handlers.persistent
 def init_nameprops(filename: str = ''):
     for obj in bpy.data.objects:
@@ -82,16 +82,17 @@ def setup_property(obj, prop_name: str, value=None, **kwargs):
 
 def setup_drivers(obj, target_obj, prop_name: str):
     add_driver = functools.partial(utils.add_driver, target_id=target_obj)
+    prop_path = f'["{prop_name}"]'
 
     match get_prop_prefix(prop_name):
         case 'visibility':
-            add_driver(obj=obj, obj_prop_path='color', target_data_path=f'["{prop_name}"]', fallback_value=1.0, index=3)
+            add_driver(obj=obj, obj_prop_path='color', target_data_path=prop_path, fallback_value=1.0, index=3)
         case 'uv_offset':
-            add_driver(obj=obj.node_tree, obj_prop_path='nodes["Mapping"].inputs[1].default_value', target_data_path=f'["{prop_name}"][0]', fallback_value=0, index=0)
-            add_driver(obj=obj.node_tree, obj_prop_path='nodes["Mapping"].inputs[1].default_value', target_data_path=f'["{prop_name}"][1]', fallback_value=0, index=1)
+            add_driver(obj=obj.node_tree, obj_prop_path='nodes["Mapping"].inputs[1].default_value', target_data_path=f'{prop_path}[0]', fallback_value=0, index=0)
+            add_driver(obj=obj.node_tree, obj_prop_path='nodes["Mapping"].inputs[1].default_value', target_data_path=f'{prop_path}[1]', fallback_value=0, index=1)
         case 'uv_tiling':
-            add_driver(obj=obj.node_tree, obj_prop_path='nodes["Mapping"].inputs[3].default_value', target_data_path=f'["{prop_name}"][0]', fallback_value=1, index=0)
-            add_driver(obj=obj.node_tree, obj_prop_path='nodes["Mapping"].inputs[3].default_value', target_data_path=f'["{prop_name}"][1]', fallback_value=1, index=1)
+            add_driver(obj=obj.node_tree, obj_prop_path='nodes["Mapping"].inputs[3].default_value', target_data_path=f'{prop_path}[0]', fallback_value=1, index=0)
+            add_driver(obj=obj.node_tree, obj_prop_path='nodes["Mapping"].inputs[3].default_value', target_data_path=f'{prop_path}[1]', fallback_value=1, index=1)
 
 
 def clear_drivers(obj, prop_name: str):
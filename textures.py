@@ -1,6 +1,8 @@
 import io
 import struct
 
+import numpy as np
+
 
 # if (imageType == 5) return FileFormats.ImgType.DXT1DDS;
 # if (imageType == 6) return FileFormats.ImgType.DXT3DDS;
@@ -55,6 +57,28 @@ def write_tga(
     dst.write(src.read(data_size))
 
 
+def decode_tga_pixels(
+    src: io.BufferedIOBase,
+    data_size: int,
+    width: int,
+    height: int,
+    grayscale: bool = False,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    # Returns flat RGBA floats in Blender's row order, i.e. already flipped along the Y-axis
+    # If set, out must hold exactly width * height * 4 float32 values and is filled in place
+    num_channels = 1 if grayscale else 4
+    data = np.frombuffer(src.read(data_size), dtype=np.uint8)
+    data = data[:width * height * num_channels].reshape(height, width, num_channels)[::-1]
+    rgba = np.empty((height, width, 4), dtype=np.float32) if out is None else out.reshape(height, width, 4)
+    if grayscale:
+        np.divide(data, 255, out=rgba[..., :3])
+        rgba[..., 3] = 1
+    else:
+        np.divide(data[..., [2, 1, 0, 3]], 255, out=rgba)  # BGRA -> RGBA
+    return rgba.ravel()
+
+
 def read_dds_header(src: io.BufferedIOBase):
     fmt = '< 4s 8x 3l 4x l 44x 8x 4s 20x 8x 12x'
     data = src.read(struct.calcsize(fmt))
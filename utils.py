@@ -3,6 +3,7 @@ import math
 
 import bpy
 import mathutils
+import numpy as np
 
 
 def console_get():
@@ -47,15 +48,28 @@ def print_rot_loc_matrix(intro: str, data):
 
 
 def flip_image_y(image):
-    import itertools
-
     width, height = image.size
-    row_size = width * image.channels
-    pixels_orig = image.pixels[:]
-    pixels = (pixels_orig[(height - row - 1) * row_size: (height - row) * row_size] for row in range(height))
-    pixels = itertools.chain.from_iterable(pixels)
-    pixels = list(pixels)
-    image.pixels[:] = pixels
+    pixels = np.empty(width * height * image.channels, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    pixels = pixels.reshape(height, -1)[::-1]
+    image.pixels.foreach_set(pixels.ravel())
+    return image
+
+
+def create_image(name: str, width: int, height: int, pixels, alpha: bool = True):
+    image = bpy.data.images.new(name, width, height, alpha=alpha)
+    image.file_format = 'TARGA_RAW'
+    image.filepath_raw = name
+    image.pixels.foreach_set(pixels)
+    return image
+
+
+def load_packed_image(name: str, data: bytes):
+    # -- Same as images.load + pack, but without writing the file to disk first
+    image = bpy.data.images.new(name, 1, 1)
+    image.filepath_raw = name
+    image.pack(data=data, data_len=len(data))
+    image.source = 'FILE'
     return image
 
 